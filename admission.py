@@ -0,0 +1,179 @@
+import hashlib
+import threading
+from functools import wraps
+
+from flask import request, jsonify, make_response, Response
+
+
+class SingleFlight:
+    """Coalesce identical concurrent calls into a single computation.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is still running wait for it and share its result.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+
+    def do(self, key, fn):
+        """Run fn() once per key among concurrent callers, return (result, shared)"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+                leader = True
+            else:
+                leader = False
+
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result'], True
+
+        try:
+            call['result'] = fn()
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call['done'].set()
+
+        return call['result'], False
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class Rejected(Exception):
+    """Raised when a request is shed by admission control"""
+
+    def __init__(self, status, reason, retry_after):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Per-endpoint concurrency limit with a bounded wait queue.
+
+    At most `max_concurrency` requests run at once. Up to `max_queue` more
+    may wait for a slot for at most `queue_timeout` seconds. Anything beyond
+    that is rejected immediately with `saturated_status` (429 by default),
+    and requests that time out in the queue are rejected with 503, so
+    latency stays bounded under bursts.
+    """
+
+    def __init__(self, name, max_concurrency=4, max_queue=16, queue_timeout=5.0, retry_after=1,
+                 saturated_status=429):
+        self.name = name
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.saturated_status = saturated_status
+
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+        self._rejected = 0
+
+    def acquire(self):
+        """Take a slot, waiting in the bounded queue if needed, or raise Rejected"""
+        # Fast path: take a free slot without queueing
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self._waiting >= self.max_queue:
+                    self._rejected += 1
+                    raise Rejected(self.saturated_status, f'{self.name} is saturated, try again later', self.retry_after)
+                self._waiting += 1
+
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+
+            if not acquired:
+                with self._lock:
+                    self._rejected += 1
+                raise Rejected(503, f'{self.name} timed out waiting for capacity', self.retry_after)
+
+        with self._lock:
+            self._running += 1
+
+    def release(self):
+        with self._lock:
+            self._running -= 1
+        self._slots.release()
+
+    def run(self, fn):
+        """Run fn() once a slot is free, or raise Rejected"""
+        self.acquire()
+        try:
+            return fn()
+        finally:
+            self.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_concurrency': self.max_concurrency,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'waiting': self._waiting,
+                'rejected': self._rejected
+            }
+
+
+def request_key():
+    """Identify a request by method, path, query string and body"""
+    digest = hashlib.sha1(request.get_data())
+    return (request.method, request.path, request.query_string, digest.hexdigest())
+
+
+def rejection_response(error):
+    """Build the 429/503 response for a Rejected error"""
+    response = jsonify({'error': error.reason})
+    response.status_code = error.status
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+
+def coalesced(controller, flight=None):
+    """Decorate a Flask view with single-flight coalescing and admission control.
+
+    Identical concurrent requests share one run of the view; only that run
+    counts against the controller's concurrency limit. Each waiter gets its
+    own copy of the response so per-request hooks (CORS etc.) stay safe.
+    """
+    flight = flight or SingleFlight()
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            def compute():
+                def render():
+                    response = make_response(view(*args, **kwargs))
+                    return response.get_data(), response.status_code, list(response.headers.items())
+                return controller.run(render)
+
+            try:
+                (body, status, headers), _ = flight.do(request_key(), compute)
+            except Rejected as e:
+                return rejection_response(e)
+
+            return Response(body, status=status, headers=headers)
+
+        wrapper.controller = controller
+        wrapper.flight = flight
+        return wrapper
+
+    return decorator
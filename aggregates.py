@@ -0,0 +1,136 @@
+from collections import Counter
+
+
+def _counts(series):
+    return {str(key): int(value) for key, value in series.value_counts().items()}
+
+
+def frame_aggregates(df):
+    """Summarize a crime frame as one record per (year, borough).
+
+    Records hold only counts and sums, so they are small enough to keep in
+    the partition manifest and can be added together to describe any set of
+    partitions without reading their rows.
+    """
+    records = []
+    for (year, borough), part in df.groupby(['YEAR', 'BOROUGH']):
+        records.append({
+            'year': int(year),
+            'borough': str(borough),
+            'rows': len(part),
+            'severity_sum': int(part['SEVERITY'].sum()),
+            'victims': int(part['VICTIMS'].sum()),
+            'property_damage': int(part['PROPERTY_DAMAGE'].sum()),
+            'lat_sum': float(part['LATITUDE'].sum()),
+            'min_lat': float(part['LATITUDE'].min()),
+            'max_lat': float(part['LATITUDE'].max()),
+            'min_lng': float(part['LONGITUDE'].min()),
+            'max_lng': float(part['LONGITUDE'].max()),
+            'months': _counts(part['MONTH']),
+            'category_months': {
+                str(category): _counts(group['MONTH']) for category, group in part.groupby('CATEGORY')
+            },
+            'crime_types': _counts(part['CRIME_TYPE']),
+            'times_of_day': _counts(part['TIME_OF_DAY']),
+            'days_of_week': _counts(part['DAY_OF_WEEK']),
+            'neighborhoods': _counts(part['NEIGHBORHOOD'])
+        })
+    return records
+
+
+def _monthly(records, field, category=None):
+    """Counts per (year, month) as [{'date': 'YYYY-MM', 'count': n}]"""
+    totals = Counter()
+    for record in records:
+        months = record[field] if category is None else record[field].get(category, {})
+        for month, count in months.items():
+            totals[(record['year'], int(month))] += count
+    return [{'date': f"{year}-{month:02d}", 'count': count} for (year, month), count in sorted(totals.items())]
+
+
+def _by_year(records, field, name):
+    """Counts per (year, value) as [{'YEAR': y, name: value, 'count': n}]"""
+    totals = Counter()
+    for record in records:
+        for value, count in record[field].items():
+            totals[(record['year'], value)] += count
+    return [{'YEAR': year, name: value, 'count': count} for (year, value), count in sorted(totals.items())]
+
+
+def _borough_years(records):
+    """Counts per (year, borough) as [{'YEAR': y, 'BOROUGH': b, 'count': n}]"""
+    totals = Counter()
+    for record in records:
+        totals[(record['year'], record['borough'])] += record['rows']
+    return [{'YEAR': year, 'BOROUGH': borough, 'count': count} for (year, borough), count in sorted(totals.items())]
+
+
+def _total(records, field):
+    totals = Counter()
+    for record in records:
+        totals.update(record[field])
+    return dict(totals)
+
+
+def data_summary(records):
+    """The dashboard summary (see /api/data-summary) from aggregate records"""
+    total_crimes = sum(record['rows'] for record in records)
+
+    def category_total(category):
+        return sum(sum(record['category_months'].get(category, {}).values()) for record in records)
+
+    borough_counts = Counter()
+    year_counts = Counter()
+    neighborhoods = Counter()
+    for record in records:
+        borough_counts[record['borough']] += record['rows']
+        year_counts[record['year']] += record['rows']
+        for neighborhood, count in record['neighborhoods'].items():
+            neighborhoods[(record['borough'], neighborhood)] += count
+
+    crime_types = sorted(_total(records, 'crime_types').items(), key=lambda item: (-item[1], item[0]))
+
+    return {
+        'total_crimes': total_crimes,
+        'violent_crimes': category_total('Violent Crimes'),
+        'property_crimes': category_total('Property Crimes'),
+        'borough_counts': dict(borough_counts),
+        'year_counts': dict(sorted(year_counts.items())),
+        'crime_type_counts': dict(crime_types[:10]),
+        'time_of_day_counts': _total(records, 'times_of_day'),
+        'day_of_week_counts': _total(records, 'days_of_week'),
+        'avg_severity': sum(record['severity_sum'] for record in records) / total_crimes if total_crimes else 0.0,
+        'total_victims': sum(record['victims'] for record in records),
+        'total_property_damage': sum(record['property_damage'] for record in records),
+        'time_series_data': _monthly(records, 'months'),
+        'neighborhood_data': [
+            {'BOROUGH': borough, 'NEIGHBORHOOD': neighborhood, 'count': count}
+            for (borough, neighborhood), count in sorted(neighborhoods.items())
+        ]
+    }
+
+
+def crime_trends(records):
+    """The dashboard trends (see /api/crime-trends) from aggregate records"""
+    return {
+        'violent_crimes_trend': _monthly(records, 'category_months', 'Violent Crimes'),
+        'property_crimes_trend': _monthly(records, 'category_months', 'Property Crimes'),
+        'crime_type_years': _by_year(records, 'crime_types', 'CRIME_TYPE'),
+        'borough_years': _borough_years(records),
+        'time_of_day_years': _by_year(records, 'times_of_day', 'TIME_OF_DAY'),
+        'day_of_week_years': _by_year(records, 'days_of_week', 'DAY_OF_WEEK')
+    }
+
+
+def aggregate_extent(records):
+    """Bounding box and mean latitude of the incidents behind the records"""
+    rows = sum(record['rows'] for record in records)
+    if not rows:
+        return None
+    return {
+        'min_lat': min(record['min_lat'] for record in records),
+        'max_lat': max(record['max_lat'] for record in records),
+        'min_lng': min(record['min_lng'] for record in records),
+        'max_lng': max(record['max_lng'] for record in records),
+        'mean_lat': sum(record['lat_sum'] for record in records) / rows
+    }
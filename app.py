@@ -1,14 +1,28 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template
 import pandas as pd
 import numpy as np
 from flask_cors import CORS
 import os
 import json
+import math
 from geopy.distance import geodesic
 import plotly.express as px
 import plotly.graph_objects as go
 import plotly.utils
-from datetime import datetime
+from datetime import datetime, timezone
+from hotspots import HotspotEngine, DEFAULT_GRID_SIZE, MAX_GRID_SIZE, DEFAULT_BANDWIDTH_M, MAX_BANDWIDTH_M
+from admission import AdmissionController, Rejected, coalesced, rejection_response
+from export import Exporter, EXPORT_FORMATS, export_key, filter_indices, iter_parts, parquet_available, parse_filters, parse_range
+from clusters import ClusterIndex, ClusterStore, result_id_for
+from live import LiveBroker, event_stream
+from caching import conditional, STATIC_POLICY
+from partitions import PartitionStore, DEFAULT_MAX_LOADED
+from aggregates import frame_aggregates, data_summary, crime_trends, aggregate_extent
+from scoring import weighted_safety_score, DEFAULT_HALF_LIFE_DAYS
+from preprocess import add_derived_columns
+import hashlib
+import hmac
+import threading
 
 app = Flask(__name__, static_folder='static', template_folder='templates')
 CORS(app)  # Enable CORS for all routes
@@ -17,33 +31,16 @@ CORS(app)  # Enable CORS for all routes
 def load_data():
     try:
         print("Loading crime data...")
+        stat = os.stat('crime_data.csv')
         df = pd.read_csv('crime_data.csv')
         print(f"Successfully loaded CSV with {len(df)} records")
         
-        # Convert date to datetime
-        df['DATE'] = pd.to_datetime(df['DATE'])
+        df = add_derived_columns(df)
         
-        # Create year and month columns for time-based analysis
-        df['YEAR'] = df['DATE'].dt.year
-        df['MONTH'] = df['DATE'].dt.month
-        df['DAY_OF_WEEK'] = df['DATE'].dt.day_name()
-        
-        # Extract hour from time for time-of-day analysis
-        df['HOUR'] = df['TIME'].apply(lambda x: int(x.split(':')[0]))
-        
-        # Create time of day category
-        time_of_day = []
-        for hour in df['HOUR']:
-            if 5 <= hour < 12:
-                time_of_day.append('Morning')
-            elif 12 <= hour < 17:
-                time_of_day.append('Afternoon')
-            elif 17 <= hour < 21:
-                time_of_day.append('Evening')
-            else:
-                time_of_day.append('Night')
-        
-        df['TIME_OF_DAY'] = time_of_day
+        # Version the dataset by the file it came from, so derived caches
+        # are invalidated when the file changes
+        set_data_source(f'csv:{stat.st_mtime_ns}:{stat.st_size}',
+                        datetime.fromtimestamp(stat.st_mtime, timezone.utc))
         
         return df
     except Exception as e:
@@ -53,17 +50,177 @@ def load_data():
 # Global variable to store the data
 crime_data = None
 
+# Version of the loaded dataset. It is derived from the data itself (the
+# source file or partition build, plus every incident added since), so a
+# version names the same content across restarts and processes
+data_source = None
+ingest_digest = ''
+data_version = None
+data_updated_at = None
+
+def _refresh_data_version(updated_at):
+    global data_version, data_updated_at
+    raw = f'{data_source}|{ingest_digest}'
+    data_version = hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
+    data_updated_at = updated_at
+
+def set_data_source(source, updated_at):
+    """Record the dataset that was loaded and reset the ingest chain"""
+    global data_source, ingest_digest
+    data_source = source
+    ingest_digest = ''
+    _refresh_data_version(updated_at)
+
+def record_ingest(incidents):
+    """Fold newly added incidents into the dataset version"""
+    global ingest_digest
+    raw = ingest_digest + json.dumps(incidents, sort_keys=True)
+    ingest_digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    _refresh_data_version(datetime.now(timezone.utc))
+
+# Serializes updates to crime_data (readers use whichever frame they grabbed)
+data_lock = threading.Lock()
+
+# Kernel density hotspot engine (caches surfaces per dataset version)
+hotspot_engine = HotspotEngine()
+
+# Admission control for the expensive endpoints: identical concurrent
+# requests are coalesced, and excess load is shed with 429/503
+crimes_admission = AdmissionController('crimes', max_concurrency=4, max_queue=16, queue_timeout=5.0)
+summary_admission = AdmissionController('data-summary', max_concurrency=2, max_queue=32, queue_timeout=5.0)
+hotspot_admission = AdmissionController('hotspots', max_concurrency=2, max_queue=16, queue_timeout=5.0)
+
+# Bulk exports get their own small pool and never queue, so long-running
+# downloads cannot crowd out interactive requests
+export_admission = AdmissionController('export', max_concurrency=2, max_queue=0, retry_after=30)
+exporter = Exporter()
+
+# Clustered route results, kept so clusters can be expanded on demand
+cluster_store = ClusterStore()
+
+# Push channel for newly added incidents. Each open stream holds a worker
+# thread for its lifetime, so the number of streams is capped and clients
+# beyond the cap are turned away with 503 and told when to reconnect
+live_broker = LiveBroker()
+live_admission = AdmissionController(
+    'live',
+    max_concurrency=int(os.environ.get('CRIME_MAX_LIVE_CLIENTS', 32)),
+    max_queue=0,
+    retry_after=30,
+    saturated_status=503
+)
+
+# Bearer token required to add incidents; ingest is disabled when unset
+ingest_token = os.environ.get('CRIME_INGEST_TOKEN')
+
+# Optional partitioned archive (see partitions.py). When present, route
+# queries load only the region/year/borough partitions they touch
+partition_store = PartitionStore.open(
+    os.environ.get('CRIME_PARTITIONS', os.path.join('data', 'partitions')),
+    int(os.environ.get('CRIME_MAX_PARTITIONS', DEFAULT_MAX_LOADED))
+)
+if partition_store is not None:
+    set_data_source(f'parts:{partition_store.version}', partition_store.built_at())
+
+def latest_incident_date():
+    """Date of the most recent incident, used as "now" for recency weighting"""
+    if partition_store is not None:
+        return partition_store.latest_date()
+    if crime_data is not None and len(crime_data):
+        return crime_data['DATE'].max()
+    return pd.Timestamp.now()
+
+def crimes_in_window(min_lat, max_lat, min_lng, max_lng, start_date=None, end_date=None, region=None):
+    """Return the crimes inside a bounding box and optional date window"""
+    if partition_store is not None:
+        return partition_store.query((min_lat, min_lng, max_lat, max_lng), start_date, end_date, region)
+    
+    filtered = crime_data[
+        (crime_data['LATITUDE'] >= min_lat) & 
+        (crime_data['LATITUDE'] <= max_lat) &
+        (crime_data['LONGITUDE'] >= min_lng) & 
+        (crime_data['LONGITUDE'] <= max_lng)
+    ]
+    if start_date:
+        filtered = filtered[filtered['DATE'] >= pd.Timestamp(start_date)]
+    if end_date:
+        filtered = filtered[filtered['DATE'] <= pd.Timestamp(end_date)]
+    return filtered
+
+def dataset_aggregates():
+    """Per year/borough aggregates of the whole dataset (None if it failed to load)"""
+    global crime_data
+    
+    # The partitioned archive is summarized from its manifest and overlay
+    if partition_store is not None:
+        return partition_store.aggregates()
+    
+    if crime_data is None:
+        crime_data = load_data()
+        if crime_data.empty:
+            return None
+    return frame_aggregates(crime_data)
+
+def dataset_frames():
+    """Iterate over the whole dataset a frame at a time (None if it failed to load)"""
+    global crime_data
+    
+    # Partitions are read one at a time, without evicting the working set
+    if partition_store is not None:
+        return partition_store.iter_frames(cache=False)
+    
+    if crime_data is None:
+        crime_data = load_data()
+        if crime_data.empty:
+            return None
+    return [crime_data]
+
+def hotspot_source(region=None):
+    """Crimes for the hotspot engine (None if they failed to load)"""
+    # A partitioned archive may hold several cities, so the grid only spans
+    # the requested region (the CSV holds a single one)
+    if partition_store is not None:
+        return lambda: (
+            partition_store.iter_frames(region=region, cache=False),
+            aggregate_extent(partition_store.aggregates(region))
+        )
+    
+    frames = dataset_frames()
+    return frames[0] if frames is not None else None
+
+def current_data_version():
+    """Return the dataset version, loading the data first if needed"""
+    global crime_data
+    
+    # The partitioned archive is versioned when it is opened
+    if crime_data is None and partition_store is None:
+        df = load_data()
+        if not df.empty:
+            crime_data = df
+    return data_version
+
+def current_last_modified():
+    return data_updated_at
+
+# Conditional GET support for endpoints derived from the dataset
+dataset_cached = conditional(current_data_version, current_last_modified)
+
+# Responses that never change for a given URL (static lookups, or results
+# already pinned to a dataset version by their id)
+static_cached = conditional(lambda: 'static', policy=STATIC_POLICY)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
 @app.route('/api/crimes', methods=['POST'])
+@coalesced(crimes_admission)
 def get_crimes():
     global crime_data
     
     try:
-        # Load data if not already loaded
-        if crime_data is None:
+        # Load data if not already loaded (partitions are loaded per request)
+        if crime_data is None and partition_store is None:
             crime_data = load_data()
             if crime_data.empty:
                 return jsonify({'error': 'Failed to load crime data'}), 500
@@ -107,13 +264,20 @@ def get_crimes():
             min_lng = min(from_lng, to_lng) - 0.02
             max_lng = max(from_lng, to_lng) + 0.02
         
-        # Filter crimes within the bounding box
-        filtered_data = crime_data[
-            (crime_data['LATITUDE'] >= min_lat) & 
-            (crime_data['LATITUDE'] <= max_lat) &
-            (crime_data['LONGITUDE'] >= min_lng) & 
-            (crime_data['LONGITUDE'] <= max_lng)
-        ]
+        # Optional date window, normalized to whole days
+        try:
+            start_date, end_date = (
+                pd.Timestamp(data[name]).strftime('%Y-%m-%d') if data.get(name) else None
+                for name in ('start_date', 'end_date')
+            )
+        except (ValueError, TypeError) as e:
+            return jsonify({'error': f'Invalid date window: {str(e)}'}), 400
+        
+        # Filter crimes within the bounding box (and optional date window)
+        filtered_data = crimes_in_window(
+            min_lat, max_lat, min_lng, max_lng,
+            start_date, end_date, data.get('region')
+        )
         
         print(f"Found {len(filtered_data)} crimes within the bounding box")
         
@@ -273,6 +437,28 @@ def get_crimes():
             safety_score -= min(20, total_severity / 2)  # Reduce up to 20 points based on severity
             safety_score -= min(20, violent_crimes * 5)  # Reduce up to 20 points based on violent crimes
         
+        # Optional model weighting each crime by recency and by how close its
+        # hour and day are to the planned departure
+        score_breakdown = None
+        if data.get('scoring') == 'weighted':
+            try:
+                departure = pd.Timestamp(data.get('departure_time') or datetime.now())
+                reference_date = pd.Timestamp(data.get('reference_date') or latest_incident_date())
+                if pd.isna(departure) or pd.isna(reference_date):
+                    raise ValueError('departure_time and reference_date must be dates')
+                # Crime dates are naive, so compare in UTC without the zone
+                if reference_date.tzinfo is not None:
+                    reference_date = reference_date.tz_convert(None)
+                half_life_days = float(data.get('half_life_days', DEFAULT_HALF_LIFE_DAYS))
+                if not (math.isfinite(half_life_days) and half_life_days > 0):
+                    raise ValueError('half_life_days must be a positive number')
+            except (ValueError, TypeError) as e:
+                return jsonify({'error': f'Invalid scoring parameters: {str(e)}'}), 400
+            
+            safety_score, score_breakdown = weighted_safety_score(
+                nearby_crimes, departure, reference_date, half_life_days
+            )
+        
         # Determine safety level
         safety_level = 'High'
         if safety_score < 60:
@@ -331,12 +517,33 @@ def get_crimes():
         print(f"Found {len(nearby_crimes)} crimes close to the route")
         print(f"Safety score: {safety_score}, Safety level: {safety_level}")
         
-        return jsonify({
-            'crimes': nearby_crimes,
+        result = {
+            'crime_count': len(nearby_crimes),
             'safety_score': safety_score,
             'safety_level': safety_level,
             'crime_stats': crime_stats
-        })
+        }
+        
+        if score_breakdown is not None:
+            result['scoring_model'] = 'weighted'
+            result['score_breakdown'] = score_breakdown
+        
+        # Precomputed per-zoom clusters instead of (or alongside) raw records
+        if data.get('cluster'):
+            index = ClusterIndex(nearby_crimes)
+            result_id = result_id_for(data_version, data)
+            cluster_store.put(result_id, index)
+            
+            result['result_id'] = result_id
+            result['min_zoom'] = index.min_zoom
+            result['max_zoom'] = index.max_zoom
+            result['clusters'] = index.summary()
+            if data.get('include_crimes'):
+                result['crimes'] = nearby_crimes
+        else:
+            result['crimes'] = nearby_crimes
+        
+        return jsonify(result)
         
     except Exception as e:
         print(f"Error in get_crimes: {str(e)}")
@@ -344,144 +551,462 @@ def get_crimes():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/crimes/clusters/<result_id>/<int:zoom>', methods=['GET'])
+@static_cached
+def get_cluster_level(result_id, zoom):
+    index = cluster_store.get(result_id)
+    if index is None:
+        return jsonify({'error': 'Route result expired, please analyze the route again'}), 404
+    if not index.min_zoom <= zoom <= index.max_zoom:
+        return jsonify({'error': f'zoom must be between {index.min_zoom} and {index.max_zoom}'}), 400
+    
+    bbox = None
+    if request.args.get('bbox'):
+        try:
+            bbox = [float(x) for x in request.args.get('bbox').split(',')]
+        except ValueError:
+            bbox = []
+        if len(bbox) != 4:
+            return jsonify({'error': 'bbox must be min_lat,min_lng,max_lat,max_lng'}), 400
+    
+    return jsonify({
+        'zoom': zoom,
+        'clusters': index.level(zoom, bbox)
+    })
+
+@app.route('/api/crimes/clusters/<result_id>/<int:zoom>/<int:cx>/<int:cy>', methods=['GET'])
+@static_cached
+def get_cluster(result_id, zoom, cx, cy):
+    index = cluster_store.get(result_id)
+    if index is None:
+        return jsonify({'error': 'Route result expired, please analyze the route again'}), 404
+    
+    cluster = index.find(zoom, cx, cy)
+    if cluster is None:
+        return jsonify({'error': 'Cluster not found'}), 404
+    
+    try:
+        offset = max(int(request.args.get('offset', 0)), 0)
+        limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    
+    members, total = index.members(zoom, cx, cy, offset, limit)
+    
+    return jsonify({
+        'cluster': cluster,
+        'children': index.children(zoom, cx, cy),
+        'members': members,
+        'total_members': total,
+        'offset': offset
+    })
+
 @app.route('/api/data-summary', methods=['GET'])
+@dataset_cached
+@coalesced(summary_admission)
 def get_data_summary():
-    global crime_data
-    
-    # Load data if not already loaded
-    if crime_data is None:
-        crime_data = load_data()
-        if crime_data.empty:
-            return jsonify({'error': 'Failed to load crime data'}), 500
+    # Summarize per year/borough aggregates, so partitions are never read in full
+    records = dataset_aggregates()
+    if records is None:
+        return jsonify({'error': 'Failed to load crime data'}), 500
     
-    # Get summary statistics
-    total_crimes = len(crime_data)
-    violent_crimes = len(crime_data[crime_data['CATEGORY'] == 'Violent Crimes'])
-    property_crimes = len(crime_data[crime_data['CATEGORY'] == 'Property Crimes'])
+    return jsonify(data_summary(records))
+
+@app.route('/api/crime-trends', methods=['GET'])
+@dataset_cached
+def get_crime_trends():
+    records = dataset_aggregates()
+    if records is None:
+        return jsonify({'error': 'Failed to load crime data'}), 500
     
-    # Get crime counts by borough
-    borough_counts = crime_data['BOROUGH'].value_counts().to_dict()
+    return jsonify(crime_trends(records))
+
+@app.route('/api/crime-heatmap', methods=['GET'])
+@dataset_cached
+def get_crime_heatmap():
+    frames = dataset_frames()
+    if frames is None:
+        return jsonify({'error': 'Failed to load crime data'}), 500
     
-    # Get crime counts by year
-    year_counts = crime_data['YEAR'].value_counts().sort_index().to_dict()
+    heatmap_data = []
+    for frame in frames:
+        # Get all crime locations with severity
+        crime_locations = frame[['LATITUDE', 'LONGITUDE', 'SEVERITY', 'CATEGORY', 'CRIME_TYPE']].to_dict('records')
+        
+        # Convert to the format needed for the heatmap
+        for crime in crime_locations:
+            heatmap_data.append({
+                'lat': float(crime['LATITUDE']),
+                'lng': float(crime['LONGITUDE']),
+                'intensity': int(crime['SEVERITY']),
+                'category': str(crime['CATEGORY']),
+                'crime_type': str(crime['CRIME_TYPE'])
+            })
     
-    # Get top crime types
-    crime_type_counts = crime_data['CRIME_TYPE'].value_counts().head(10).to_dict()
+    return jsonify({
+        'heatmap_data': heatmap_data
+    })
+
+def parse_hotspot_params():
+    """Read the shared hotspot query parameters from the request"""
+    grid_size = int(request.args.get('grid_size', DEFAULT_GRID_SIZE))
+    bandwidth_m = float(request.args.get('bandwidth', DEFAULT_BANDWIDTH_M))
     
-    # Get crime counts by time of day
-    time_of_day_counts = crime_data['TIME_OF_DAY'].value_counts().to_dict()
+    if not 8 <= grid_size <= MAX_GRID_SIZE:
+        raise ValueError(f'grid_size must be between 8 and {MAX_GRID_SIZE}')
+    if not (math.isfinite(bandwidth_m) and 0 < bandwidth_m <= MAX_BANDWIDTH_M):
+        raise ValueError(f'bandwidth must be between 0 and {MAX_BANDWIDTH_M:g} meters')
     
-    # Get crime counts by day of week
-    day_of_week_counts = crime_data['DAY_OF_WEEK'].value_counts().to_dict()
+    return {
+        'grid_size': grid_size,
+        'bandwidth_m': bandwidth_m,
+        'category': request.args.get('category') or None,
+        'time_of_day': request.args.get('time_of_day') or None,
+        'region': request.args.get('region') or None
+    }
+
+@app.route('/api/hotspots/grid', methods=['GET'])
+@dataset_cached
+@coalesced(hotspot_admission)
+def get_hotspot_grid():
+    source = hotspot_source(request.args.get('region') or None)
+    if source is None:
+        return jsonify({'error': 'Failed to load crime data'}), 500
     
-    # Get average severity
-    avg_severity = float(crime_data['SEVERITY'].mean())
+    try:
+        params = parse_hotspot_params()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Get total victims
-    total_victims = int(crime_data['VICTIMS'].sum())
+    surface = hotspot_engine.surface(source, data_version, **params)
+    density = surface['density']
     
-    # Get total property damage
-    total_property_damage = int(crime_data['PROPERTY_DAMAGE'].sum())
+    return jsonify({
+        'bounds': surface['bounds'],
+        'grid_size': surface['grid_size'],
+        'bandwidth_m': surface['bandwidth_m'],
+        'cell_height_m': surface['cell_height_m'],
+        'cell_width_m': surface['cell_width_m'],
+        'incident_count': surface['incident_count'],
+        'max_density': float(density.max()),
+        'data_version': data_version,
+        # Rows run from south to north, columns from west to east
+        'density': np.round(density, 4).tolist()
+    })
+
+@app.route('/api/hotspots', methods=['GET'])
+@dataset_cached
+@coalesced(hotspot_admission)
+def get_hotspots():
+    source = hotspot_source(request.args.get('region') or None)
+    if source is None:
+        return jsonify({'error': 'Failed to load crime data'}), 500
     
-    # Generate time series data for crimes by month
-    time_series = crime_data.groupby(['YEAR', 'MONTH']).size().reset_index(name='count')
-    time_series['date'] = time_series.apply(lambda x: f"{int(x['YEAR'])}-{int(x['MONTH']):02d}", axis=1)
-    time_series_data = time_series[['date', 'count']].to_dict('records')
+    try:
+        params = parse_hotspot_params()
+        top_n = int(request.args.get('top', 10))
+        if top_n < 1:
+            raise ValueError('top must be at least 1')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Generate choropleth data for crimes by neighborhood
-    neighborhood_data = crime_data.groupby(['BOROUGH', 'NEIGHBORHOOD']).size().reset_index(name='count')
-    neighborhood_data = neighborhood_data.to_dict('records')
+    hotspots = hotspot_engine.hotspots(source, data_version, top_n=top_n, **params)
     
     return jsonify({
-        'total_crimes': total_crimes,
-        'violent_crimes': violent_crimes,
-        'property_crimes': property_crimes,
-        'borough_counts': borough_counts,
-        'year_counts': year_counts,
-        'crime_type_counts': crime_type_counts,
-        'time_of_day_counts': time_of_day_counts,
-        'day_of_week_counts': day_of_week_counts,
-        'avg_severity': avg_severity,
-        'total_victims': total_victims,
-        'total_property_damage': total_property_damage,
-        'time_series_data': time_series_data,
-        'neighborhood_data': neighborhood_data
+        'hotspots': hotspots,
+        'bandwidth_m': params['bandwidth_m'],
+        'data_version': data_version
     })
 
-@app.route('/api/crime-trends', methods=['GET'])
-def get_crime_trends():
+@app.route('/api/version', methods=['GET'])
+def get_data_version():
+    version = current_data_version()
+    
+    response = jsonify({
+        'data_version': version,
+        'last_modified': data_updated_at.isoformat() if data_updated_at else None
+    })
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@app.route('/api/export', methods=['GET'])
+def export_crimes():
     global crime_data
     
-    # Load data if not already loaded
-    if crime_data is None:
+    # Load data if not already loaded (partitions are loaded per request)
+    if crime_data is None and partition_store is None:
         crime_data = load_data()
         if crime_data.empty:
             return jsonify({'error': 'Failed to load crime data'}), 500
     
-    # Generate time series for violent crimes
-    violent_ts = crime_data[crime_data['CATEGORY'] == 'Violent Crimes'].groupby(['YEAR', 'MONTH']).size().reset_index(name='count')
-    violent_ts['date'] = violent_ts.apply(lambda x: f"{int(x['YEAR'])}-{int(x['MONTH']):02d}", axis=1)
-    violent_ts_data = violent_ts[['date', 'count']].to_dict('records')
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export requires pyarrow'}), 501
     
-    # Generate time series for property crimes
-    property_ts = crime_data[crime_data['CATEGORY'] == 'Property Crimes'].groupby(['YEAR', 'MONTH']).size().reset_index(name='count')
-    property_ts['date'] = property_ts.apply(lambda x: f"{int(x['YEAR'])}-{int(x['MONTH']):02d}", axis=1)
-    property_ts_data = property_ts[['date', 'count']].to_dict('records')
+    try:
+        filters = parse_filters(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     
-    # Get crime type trends over years
-    crime_type_years = crime_data.groupby(['YEAR', 'CRIME_TYPE']).size().reset_index(name='count')
-    crime_type_years_data = crime_type_years.to_dict('records')
+    try:
+        export_admission.acquire()
+    except Rejected as e:
+        return rejection_response(e)
     
-    # Get borough trends over years
-    borough_years = crime_data.groupby(['YEAR', 'BOROUGH']).size().reset_index(name='count')
-    borough_years_data = borough_years.to_dict('records')
+    try:
+        # Pin the current dataset so the stream stays consistent if it is replaced
+        if partition_store is not None:
+            # Read the partitions the bbox and date window touch one at a
+            # time while streaming; the row count is not known up front
+            def make_parts():
+                frames = partition_store.iter_frames(
+                    filters.get('bbox'), filters.get('start_date'), filters.get('end_date'),
+                    filters.get('region'), cache=False
+                )
+                return iter_parts(frames, filters)
+            row_count, columns = None, partition_store.columns
+        else:
+            df = crime_data
+            indices = filter_indices(df, filters)
+            def make_parts():
+                return [(df, indices)]
+            row_count, columns = len(indices), list(df.columns)
+        key = export_key(data_version, fmt, filters)
+        etag = f'"{key}"'
+        
+        status = 200
+        start, end, total = 0, None, None
+        sizes = exporter.chunk_sizes(key)
+        
+        # Honour Range only if If-Range (when sent) still matches this export
+        range_header = request.headers.get('Range')
+        if_range = request.headers.get('If-Range')
+        if range_header and (not if_range or if_range == etag):
+            # Count the bytes of any chunks not yet indexed (for instance after
+            # an interrupted download) so the total size is known
+            if sizes is None:
+                sizes = exporter.measure(make_parts(), fmt, key, columns)
+            total = sum(sizes)
+            try:
+                byte_range = parse_range(range_header, total)
+            except ValueError:
+                export_admission.release()
+                response = jsonify({'error': 'Requested range not satisfiable'})
+                response.status_code = 416
+                response.headers['Content-Range'] = f'bytes */{total}'
+                return response
+            if byte_range is not None:
+                start, end = byte_range
+                status = 206
+        elif sizes is not None:
+            total = sum(sizes)
+    except Exception:
+        export_admission.release()
+        raise
     
-    # Get time of day trends
-    time_of_day_years = crime_data.groupby(['YEAR', 'TIME_OF_DAY']).size().reset_index(name='count')
-    time_of_day_years_data = time_of_day_years.to_dict('records')
+    response = Response(
+        exporter.stream(make_parts(), fmt, key, start, end, columns),
+        status=status,
+        content_type=EXPORT_FORMATS[fmt]
+    )
+    response.call_on_close(export_admission.release)
     
-    # Get day of week trends
-    day_of_week_years = crime_data.groupby(['YEAR', 'DAY_OF_WEEK']).size().reset_index(name='count')
-    day_of_week_years_data = day_of_week_years.to_dict('records')
+    response.headers['Accept-Ranges'] = 'bytes'
+    response.headers['ETag'] = etag
+    if row_count is not None:
+        response.headers['X-Total-Rows'] = str(row_count)
+    response.headers['Content-Disposition'] = f'attachment; filename=crime_export.{fmt}'
+    if status == 206:
+        response.headers['Content-Range'] = f'bytes {start}-{end}/{total}'
+        response.headers['Content-Length'] = str(end - start + 1)
+    elif total is not None:
+        response.headers['Content-Length'] = str(total)
     
-    return jsonify({
-        'violent_crimes_trend': violent_ts_data,
-        'property_crimes_trend': property_ts_data,
-        'crime_type_years': crime_type_years_data,
-        'borough_years': borough_years_data,
-        'time_of_day_years': time_of_day_years_data,
-        'day_of_week_years': day_of_week_years_data
-    })
+    if row_count is not None:
+        print(f"Exporting {row_count} records as {fmt}")
+    else:
+        print(f"Exporting partitioned records as {fmt}")
+    return response
 
-@app.route('/api/crime-heatmap', methods=['GET'])
-def get_crime_heatmap():
+# Fields accepted when adding an incident, with their defaults (None = required)
+INCIDENT_FIELDS = {
+    'date': None,
+    'time': None,
+    'latitude': None,
+    'longitude': None,
+    'category': None,
+    'crime_type': None,
+    'severity': None,
+    'borough': '',
+    'neighborhood': '',
+    'victims': 0,
+    'property_damage': 0,
+    'street_address': '',
+    'status': 'Under Investigation'
+}
+
+def crime_record(crime):
+    """Convert a crime_data row to the JSON shape used by the API"""
+    return {
+        'id': int(crime['CRIME_ID']),
+        'latitude': float(crime['LATITUDE']),
+        'longitude': float(crime['LONGITUDE']),
+        'date': str(crime['DATE'].date()),
+        'time': str(crime['TIME']),
+        'borough': str(crime['BOROUGH']),
+        'neighborhood': str(crime['NEIGHBORHOOD']),
+        'category': str(crime['CATEGORY']),
+        'crime_type': str(crime['CRIME_TYPE']),
+        'severity': int(crime['SEVERITY']),
+        'victims': int(crime['VICTIMS']),
+        'property_damage': int(crime['PROPERTY_DAMAGE']),
+        'street_address': str(crime['STREET_ADDRESS']),
+        'status': str(crime['STATUS']),
+        'year': int(crime['YEAR']),
+        'month': int(crime['MONTH']),
+        'day_of_week': str(crime['DAY_OF_WEEK']),
+        'hour': int(crime['HOUR']),
+        'time_of_day': str(crime['TIME_OF_DAY'])
+    }
+
+def parse_incident(item):
+    """Validate one posted incident and return it as a crime_data row"""
+    row = {}
+    for field, default in INCIDENT_FIELDS.items():
+        value = item.get(field, default)
+        if value is None:
+            raise ValueError(f'Missing field: {field}')
+        row[field.upper()] = value
+    
+    row['LATITUDE'] = float(row['LATITUDE'])
+    row['LONGITUDE'] = float(row['LONGITUDE'])
+    if not (math.isfinite(row['LATITUDE']) and -90 <= row['LATITUDE'] <= 90):
+        raise ValueError('latitude must be between -90 and 90')
+    if not (math.isfinite(row['LONGITUDE']) and -180 <= row['LONGITUDE'] <= 180):
+        raise ValueError('longitude must be between -180 and 180')
+    row['SEVERITY'] = int(row['SEVERITY'])
+    row['VICTIMS'] = int(row['VICTIMS'])
+    row['PROPERTY_DAMAGE'] = int(row['PROPERTY_DAMAGE'])
+    row['DATE'] = pd.Timestamp(row['DATE']).strftime('%Y-%m-%d')
+    
+    hour, minute = (int(part) for part in str(row['TIME']).split(':')[:2])
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        raise ValueError(f"Invalid time: {row['TIME']}")
+    row['TIME'] = f'{hour:02d}:{minute:02d}'
+    
+    if not 1 <= row['SEVERITY'] <= 10:
+        raise ValueError('severity must be between 1 and 10')
+    
+    return row
+
+def dataset_counters(df):
+    """Headline counters shown on the dashboard"""
+    return {
+        'total_crimes': len(df),
+        'violent_crimes': int((df['CATEGORY'] == 'Violent Crimes').sum()),
+        'property_crimes': int((df['CATEGORY'] == 'Property Crimes').sum())
+    }
+
+def next_crime_id():
+    """Return the next unused CRIME_ID across the loaded data and partitions"""
+    ids = [10000]
+    if crime_data is not None and len(crime_data):
+        ids.append(int(crime_data['CRIME_ID'].max()) + 1)
+    if partition_store is not None:
+        ids.append(partition_store.next_crime_id())
+    return max(ids)
+
+@app.route('/api/incidents', methods=['POST'])
+def add_incidents():
     global crime_data
     
-    # Load data if not already loaded
-    if crime_data is None:
+    # Writes are only accepted with the configured ingest token
+    if not ingest_token:
+        return jsonify({'error': 'Incident ingest is disabled'}), 403
+    supplied = request.headers.get('Authorization', '')
+    if not hmac.compare_digest(supplied.encode('utf-8'), f'Bearer {ingest_token}'.encode('utf-8')):
+        return jsonify({'error': 'Invalid or missing ingest token'}), 401
+    
+    # Load data if not already loaded (partitions need no preloading)
+    if crime_data is None and partition_store is None:
         crime_data = load_data()
         if crime_data.empty:
             return jsonify({'error': 'Failed to load crime data'}), 500
     
-    # Get all crime locations with severity
-    crime_locations = crime_data[['LATITUDE', 'LONGITUDE', 'SEVERITY', 'CATEGORY', 'CRIME_TYPE']].to_dict('records')
+    # Accept either a single incident or a list of them
+    data = request.json
+    items = data if isinstance(data, list) else [data]
     
-    # Convert to the format needed for the heatmap
-    heatmap_data = []
-    for crime in crime_locations:
-        heatmap_data.append({
-            'lat': float(crime['LATITUDE']),
-            'lng': float(crime['LONGITUDE']),
-            'intensity': int(crime['SEVERITY']),
-            'category': str(crime['CATEGORY']),
-            'crime_type': str(crime['CRIME_TYPE'])
-        })
+    try:
+        rows = [parse_incident(item) for item in items]
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({'error': f'Invalid incident: {str(e)}'}), 400
+    
+    if not rows:
+        return jsonify({'error': 'No incidents provided'}), 400
+    
+    with data_lock:
+        new_rows = pd.DataFrame(rows)
+        next_id = next_crime_id()
+        new_rows.insert(0, 'CRIME_ID', range(next_id, next_id + len(new_rows)))
+        new_rows = add_derived_columns(new_rows)
+        
+        # Build a new frame rather than appending in place, so requests that
+        # are still streaming from the old one see a consistent snapshot
+        if crime_data is not None:
+            crime_data = pd.concat([crime_data, new_rows[crime_data.columns]], ignore_index=True)
+        if partition_store is not None:
+            partition_store.append(new_rows[partition_store.columns])
+        
+        incidents = [crime_record(crime) for _, crime in new_rows.iterrows()]
+        record_ingest(incidents)
+        
+        if partition_store is not None:
+            counters = partition_store.counters()
+        else:
+            counters = dataset_counters(crime_data)
+        live_broker.publish(incidents, counters, data_version)
+    
+    print(f"Added {len(incidents)} incidents, dataset version {data_version}")
     
     return jsonify({
-        'heatmap_data': heatmap_data
-    })
+        'added': incidents,
+        'counters': counters,
+        'data_version': data_version
+    }), 201
+
+@app.route('/api/live', methods=['GET'])
+def live_updates():
+    bbox = None
+    if request.args.get('bbox'):
+        try:
+            bbox = [float(x) for x in request.args.get('bbox').split(',')]
+        except ValueError:
+            bbox = []
+        if len(bbox) != 4:
+            return jsonify({'error': 'bbox must be min_lat,min_lng,max_lat,max_lng'}), 400
+    
+    try:
+        live_admission.acquire()
+    except Rejected as e:
+        return rejection_response(e)
+    
+    subscription = live_broker.subscribe(bbox)
+    
+    def close():
+        subscription.close()
+        live_admission.release()
+    
+    response = Response(event_stream(subscription), content_type='text/event-stream')
+    response.call_on_close(close)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable proxy buffering
+    return response
 
 @app.route('/api/geocode', methods=['GET'])
+@static_cached
 def geocode_location():
     location = request.args.get('location', '')
     
@@ -0,0 +1,73 @@
+import hashlib
+from functools import wraps
+
+from flask import request, make_response, Response
+
+# Cache policy for responses that change whenever the dataset does: browsers
+# always revalidate (cheap, thanks to the ETag) while shared caches such as a
+# CDN or reverse proxy may serve them for a few seconds and revalidate in the
+# background
+DATASET_POLICY = 'public, max-age=0, must-revalidate, s-maxage=10, stale-while-revalidate=30'
+
+# Policy for URLs pinned to the current dataset version with ?v=<version>;
+# versions are derived from the data itself, so such a URL never changes
+# content (even across restarts) and can be cached for good
+PINNED_POLICY = 'public, max-age=31536000, immutable'
+
+# Policy for responses that do not depend on the dataset at all
+STATIC_POLICY = 'public, max-age=86400'
+
+
+def make_etag(version):
+    """Strong ETag for the current request at a given dataset version"""
+    args = sorted((key, value) for key, value in request.args.items(multi=True) if key != 'v')
+    digest = hashlib.sha1(f"{request.path}?{args}".encode('utf-8')).hexdigest()[:16]
+    return f"v{version}-{digest}"
+
+
+def not_modified(etag, last_modified):
+    """Return True if the request's validators match the current representation"""
+    # If-None-Match takes precedence over If-Modified-Since, and uses the
+    # weak comparison (proxies that compress responses weaken the ETag)
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def conditional(get_version, get_last_modified=lambda: None, policy=DATASET_POLICY):
+    """Decorate a GET view with ETag/Last-Modified validation and Cache-Control.
+
+    The ETag is derived from the dataset version and the request URL, so a
+    matching If-None-Match is answered with 304 before the view runs.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            version = get_version()
+            etag = make_etag(version)
+            last_modified = get_last_modified()
+
+            cache_control = policy
+            if policy == DATASET_POLICY and request.args.get('v') == str(version):
+                cache_control = PINNED_POLICY
+
+            if not_modified(etag, last_modified):
+                response = Response(status=304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                # Errors keep their default (uncached) headers
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = cache_control
+            response.headers['X-Data-Version'] = str(version)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,179 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Zoom levels clusters are precomputed for (Leaflet/OSM zoom numbering)
+MIN_ZOOM = 10
+MAX_ZOOM = 17
+
+# Width of a clustering cell in screen pixels
+CLUSTER_RADIUS_PX = 40
+
+# Levels with more clusters than this are left out of the route response
+# and fetched on demand
+MAX_INLINE_CLUSTERS = 200
+
+# Number of clustered route results kept for lazy expansion
+STORE_SIZE = 64
+
+# Severity buckets used for the severity mix (matches the popup classes)
+SEVERITY_BUCKETS = (('low', 1, 3), ('medium', 4, 6), ('high', 7, 10))
+
+
+def project(lats, lngs):
+    """Project lat/lng to Web Mercator world coordinates in [0, 1)"""
+    lats = np.clip(np.asarray(lats, dtype=float), -85.05112878, 85.05112878)
+    lngs = np.asarray(lngs, dtype=float)
+    x = (lngs + 180.0) / 360.0
+    sin_lat = np.sin(np.radians(lats))
+    y = 0.5 - np.log((1 + sin_lat) / (1 - sin_lat)) / (4 * np.pi)
+    return x, y
+
+
+def cells_per_axis(zoom):
+    return 256 * (2 ** zoom) / CLUSTER_RADIUS_PX
+
+
+class ClusterIndex:
+    """Hierarchical grid clusters over a set of crimes, one level per zoom.
+
+    Cells at zoom z+1 are exactly half the width of those at zoom z, so
+    every cluster nests inside a single parent and a cluster's children are
+    the cells at the next zoom whose indices halve to its own.
+    """
+
+    def __init__(self, crimes, min_zoom=MIN_ZOOM, max_zoom=MAX_ZOOM):
+        self.crimes = crimes
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+
+        self.lats = np.array([crime['latitude'] for crime in crimes], dtype=float)
+        self.lngs = np.array([crime['longitude'] for crime in crimes], dtype=float)
+        self.severity = np.array([crime['severity'] for crime in crimes], dtype=int)
+        self.violent = np.array([crime['category'] == 'Violent Crimes' for crime in crimes], dtype=bool)
+        self.x, self.y = project(self.lats, self.lngs)
+
+        self.levels = {zoom: self._build_level(zoom) for zoom in range(min_zoom, max_zoom + 1)}
+
+    def cell_indices(self, zoom):
+        scale = cells_per_axis(zoom)
+        return np.floor(self.x * scale).astype(np.int64), np.floor(self.y * scale).astype(np.int64)
+
+    def _build_level(self, zoom):
+        if len(self.crimes) == 0:
+            return []
+
+        cx, cy = self.cell_indices(zoom)
+        cells, inverse = np.unique(np.stack([cx, cy], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        n = len(cells)
+
+        counts = np.bincount(inverse, minlength=n)
+        lat_sum = np.bincount(inverse, weights=self.lats, minlength=n)
+        lng_sum = np.bincount(inverse, weights=self.lngs, minlength=n)
+        severity_sum = np.bincount(inverse, weights=self.severity, minlength=n)
+        violent = np.bincount(inverse, weights=self.violent, minlength=n)
+
+        mix = {}
+        for name, low, high in SEVERITY_BUCKETS:
+            in_bucket = (self.severity >= low) & (self.severity <= high)
+            mix[name] = np.bincount(inverse, weights=in_bucket, minlength=n)
+
+        min_lat = np.full(n, np.inf)
+        max_lat = np.full(n, -np.inf)
+        min_lng = np.full(n, np.inf)
+        max_lng = np.full(n, -np.inf)
+        np.minimum.at(min_lat, inverse, self.lats)
+        np.maximum.at(max_lat, inverse, self.lats)
+        np.minimum.at(min_lng, inverse, self.lngs)
+        np.maximum.at(max_lng, inverse, self.lngs)
+
+        clusters = []
+        for i in range(n):
+            count = int(counts[i])
+            clusters.append({
+                'id': f"{zoom}/{int(cells[i][0])}/{int(cells[i][1])}",
+                'lat': float(lat_sum[i] / count),
+                'lng': float(lng_sum[i] / count),
+                'count': count,
+                'avg_severity': round(float(severity_sum[i] / count), 2),
+                'violent': int(violent[i]),
+                'severity_mix': {name: int(mix[name][i]) for name, _, _ in SEVERITY_BUCKETS},
+                'bounds': [[float(min_lat[i]), float(min_lng[i])], [float(max_lat[i]), float(max_lng[i])]]
+            })
+
+        return clusters
+
+    def summary(self, max_clusters=MAX_INLINE_CLUSTERS):
+        """Precomputed levels small enough to send inline, keyed by zoom"""
+        return {
+            str(zoom): clusters
+            for zoom, clusters in self.levels.items()
+            if len(clusters) <= max_clusters
+        }
+
+    def level(self, zoom, bbox=None):
+        """Clusters at one zoom level, optionally limited to a bounding box"""
+        clusters = self.levels.get(zoom, [])
+        if bbox is None:
+            return clusters
+        min_lat, min_lng, max_lat, max_lng = bbox
+        return [
+            cluster for cluster in clusters
+            if min_lat <= cluster['lat'] <= max_lat and min_lng <= cluster['lng'] <= max_lng
+        ]
+
+    def find(self, zoom, cx, cy):
+        cluster_id = f"{zoom}/{cx}/{cy}"
+        for cluster in self.levels.get(zoom, []):
+            if cluster['id'] == cluster_id:
+                return cluster
+        return None
+
+    def children(self, zoom, cx, cy):
+        """Clusters at the next zoom level that nest inside this one"""
+        if zoom >= self.max_zoom:
+            return []
+        result = []
+        for cluster in self.levels[zoom + 1]:
+            _, child_x, child_y = (int(part) for part in cluster['id'].split('/'))
+            if child_x // 2 == cx and child_y // 2 == cy:
+                result.append(cluster)
+        return result
+
+    def members(self, zoom, cx, cy, offset=0, limit=50):
+        """A page of the crimes inside a cluster"""
+        cell_x, cell_y = self.cell_indices(zoom)
+        positions = np.flatnonzero((cell_x == cx) & (cell_y == cy))
+        return [self.crimes[i] for i in positions[offset:offset + limit]], len(positions)
+
+
+class ClusterStore:
+    """LRU of clustered route results, so clusters can be expanded lazily"""
+
+    def __init__(self, size=STORE_SIZE):
+        self.size = size
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, result_id, index):
+        with self._lock:
+            self._results[result_id] = index
+            self._results.move_to_end(result_id)
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+
+    def get(self, result_id):
+        with self._lock:
+            index = self._results.get(result_id)
+            if index is not None:
+                self._results.move_to_end(result_id)
+            return index
+
+
+def result_id_for(data_version, payload):
+    """Deterministic id for a route result, so identical requests share it"""
+    raw = f"{data_version}|{sorted(payload.items())}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:16]
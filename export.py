@@ -0,0 +1,312 @@
+import hashlib
+import importlib.util
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Rows rendered per streamed chunk
+CHUNK_ROWS = 10000
+
+# Supported export formats and their content types
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+# Number of chunk size indexes kept for range requests
+INDEX_CACHE_SIZE = 64
+
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def parse_filters(args):
+    """Read export filters from request arguments, raising ValueError on bad input"""
+    filters = {}
+
+    bbox = args.get('bbox')
+    if bbox:
+        parts = [float(x) for x in bbox.split(',')]
+        if len(parts) != 4:
+            raise ValueError('bbox must be min_lat,min_lng,max_lat,max_lng')
+        filters['bbox'] = tuple(parts)
+
+    for name in ('start_date', 'end_date'):
+        if args.get(name):
+            filters[name] = pd.Timestamp(args.get(name)).strftime('%Y-%m-%d')
+
+    for name in ('category', 'crime_type', 'borough', 'neighborhood', 'time_of_day', 'status'):
+        if args.get(name):
+            filters[name] = args.get(name)
+
+    # Regions are partitions of the archive, so they choose which partitions
+    # are read rather than filtering rows
+    if args.get('region'):
+        filters['region'] = args.get('region')
+
+    return filters
+
+
+def filter_indices(df, filters):
+    """Return the positional indices of the rows matching the filters"""
+    mask = np.ones(len(df), dtype=bool)
+
+    if 'bbox' in filters:
+        min_lat, min_lng, max_lat, max_lng = filters['bbox']
+        lats = df['LATITUDE'].to_numpy()
+        lngs = df['LONGITUDE'].to_numpy()
+        mask &= (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+
+    if 'start_date' in filters:
+        mask &= (df['DATE'] >= pd.Timestamp(filters['start_date'])).to_numpy()
+    if 'end_date' in filters:
+        mask &= (df['DATE'] <= pd.Timestamp(filters['end_date'])).to_numpy()
+
+    for name in ('category', 'crime_type', 'borough', 'neighborhood', 'time_of_day', 'status'):
+        if name in filters:
+            mask &= (df[name.upper()] == filters[name]).to_numpy()
+
+    return np.flatnonzero(mask)
+
+
+def iter_parts(frames, filters):
+    """Pair each frame with the positional indices of its rows matching the filters"""
+    for df in frames:
+        yield df, filter_indices(df, filters)
+
+
+def export_key(data_version, fmt, filters):
+    """Stable identifier for an export, used as its ETag"""
+    raw = f"{data_version}|{fmt}|{sorted(filters.items())}|{CHUNK_ROWS}"
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def _chunk_frame(df, indices, start):
+    """Return the frame for the chunk starting at position `start` of indices"""
+    frame = df.iloc[indices[start:start + CHUNK_ROWS]]
+    return frame.assign(DATE=frame['DATE'].dt.strftime('%Y-%m-%d'))
+
+
+def render_chunk(frame, fmt, first):
+    """Render one chunk as CSV or NDJSON bytes"""
+    if fmt == 'csv':
+        return frame.to_csv(index=False, header=first).encode('utf-8')
+
+    if frame.empty:
+        return b''
+    text = frame.to_json(orient='records', lines=True)
+    if not text.endswith('\n'):
+        text += '\n'
+    return text.encode('utf-8')
+
+
+class _ChunkSink:
+    """Write-only file object that hands out what has been written so far"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _empty_frame(template, columns):
+    """Frame with no rows, typed like `template` when there is one"""
+    if template is not None:
+        return _chunk_frame(template, [], 0)
+    return pd.DataFrame(columns=columns)
+
+
+def _chunk_frames(parts, columns, first_chunk=0):
+    """Yield (number, frame) for each chunk from first_chunk on, numbered across parts.
+
+    An export with no matching rows still yields one empty chunk, so CSV
+    gets its header and Parquet a valid file.
+    """
+    number = 0
+    template = None
+    for df, indices in parts:
+        template = df
+        for start in range(0, len(indices), CHUNK_ROWS):
+            if number >= first_chunk:
+                yield number, _chunk_frame(df, indices, start)
+            number += 1
+    if number == 0:
+        yield 0, _empty_frame(template, columns)
+
+
+def iter_parquet(parts, columns=()):
+    """Yield a Parquet file as one row group per chunk"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError('Parquet export requires pyarrow')
+
+    sink = _ChunkSink()
+    writer = None
+    for _, frame in _chunk_frames(parts, columns):
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table.cast(writer.schema))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+class Exporter:
+    """Stream filtered incidents in chunks with byte range support.
+
+    The export is a sequence of parts, each a frame and the indices of its
+    selected rows, rendered CHUNK_ROWS at a time, so neither the full export
+    nor (for a partitioned archive) more than one partition is held in
+    memory. For CSV and NDJSON the byte size of every chunk is recorded (per
+    dataset version and filter), which lets a range request jump straight
+    to the chunk containing its first byte.
+    Parquet has a footer that depends on every row group, so ranges there
+    regenerate the file and discard the skipped prefix.
+
+    Sizes are recorded by every stream as it renders, so an interrupted
+    download leaves the index of the prefix it got through; `measure`
+    counts the rest for a range request that arrives before the index is
+    complete. Rendering holds the GIL, so isolation from interactive
+    traffic comes from the export admission limit, not from the stream.
+    """
+
+    def __init__(self, cache_size=INDEX_CACHE_SIZE):
+        self.cache_size = cache_size
+        self._sizes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, key):
+        """The (possibly partial) size index for an export, created if missing"""
+        with self._lock:
+            entry = self._sizes.get(key)
+            if entry is None:
+                entry = self._sizes[key] = {'sizes': [], 'complete': False}
+            self._sizes.move_to_end(key)
+            while len(self._sizes) > self.cache_size:
+                self._sizes.popitem(last=False)
+            return entry
+
+    def _record(self, entry, number, size):
+        # Chunks are rendered in order, so only the next unknown one extends the index
+        with self._lock:
+            if number == len(entry['sizes']):
+                entry['sizes'].append(size)
+
+    def _complete(self, entry):
+        with self._lock:
+            entry['complete'] = True
+
+    def chunk_sizes(self, key):
+        """Byte size of every chunk of an export, or None unless all are known"""
+        with self._lock:
+            entry = self._sizes.get(key)
+            if entry is None or not entry['complete']:
+                return None
+            self._sizes.move_to_end(key)
+            return list(entry['sizes'])
+
+    def iter_chunks(self, parts, fmt, columns=(), first_chunk=0):
+        """Yield (number, bytes) for each chunk from first_chunk on"""
+        if fmt == 'parquet':
+            yield from enumerate(iter_parquet(parts, columns))
+            return
+
+        for number, frame in _chunk_frames(parts, columns, first_chunk):
+            yield number, render_chunk(frame, fmt, number == 0)
+
+    def measure(self, parts, fmt, key, columns=()):
+        """Complete the size index by rendering the chunks it lacks and counting their bytes.
+
+        Each chunk is dropped as soon as it is counted, so memory stays
+        constant; returns the sizes of all chunks.
+        """
+        entry = self._entry(key)
+        if not entry['complete']:
+            first_chunk = 0 if fmt == 'parquet' else len(entry['sizes'])
+            for number, chunk in self.iter_chunks(parts, fmt, columns, first_chunk):
+                self._record(entry, number, len(chunk))
+            self._complete(entry)
+        with self._lock:
+            return list(entry['sizes'])
+
+    def stream(self, parts, fmt, key, start=0, end=None, columns=()):
+        """Yield bytes [start, end] of the export (end inclusive, None for EOF)"""
+        entry = self._entry(key)
+        with self._lock:
+            sizes = list(entry['sizes'])
+
+        # Jump to the chunk containing `start` using the sizes known so far
+        first_chunk = 0
+        offset = 0
+        if fmt != 'parquet':
+            while first_chunk < len(sizes) and offset + sizes[first_chunk] <= start:
+                offset += sizes[first_chunk]
+                first_chunk += 1
+
+        for number, chunk in self.iter_chunks(parts, fmt, columns, first_chunk):
+            self._record(entry, number, len(chunk))
+
+            chunk_start = offset
+            offset += len(chunk)
+            if offset <= start:
+                continue
+
+            lo = max(start - chunk_start, 0)
+            hi = len(chunk) if end is None else min(end + 1 - chunk_start, len(chunk))
+            if lo < hi:
+                yield chunk[lo:hi]
+
+            if end is not None and offset > end:
+                return
+
+        self._complete(entry)
+
+
+def parse_range(header, total):
+    """Parse a single `bytes=` Range header into (start, end), inclusive.
+
+    Returns None when there is no usable range and raises ValueError when
+    the range cannot be satisfied.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    if first == '':
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length <= 0:
+            raise ValueError('Unsatisfiable range')
+        return max(total - length, 0), total - 1
+
+    start = int(first)
+    end = int(last) if last else total - 1
+    if start >= total or end < start:
+        raise ValueError('Unsatisfiable range')
+    return start, min(end, total - 1)
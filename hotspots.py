@@ -0,0 +1,221 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Approximate length of one degree of latitude in meters
+METERS_PER_DEGREE = 111320.0
+
+# Default and maximum grid resolution (cells per side)
+DEFAULT_GRID_SIZE = 128
+MAX_GRID_SIZE = 512
+
+# Default and maximum Gaussian kernel bandwidth in meters
+DEFAULT_BANDWIDTH_M = 300.0
+MAX_BANDWIDTH_M = 5000.0
+
+# Number of computed surfaces kept in memory
+CACHE_SIZE = 32
+
+
+class HotspotEngine:
+    """Kernel density risk surfaces computed by FFT convolution.
+
+    Incidents are binned onto a regular lat/lng grid (weighted by severity)
+    and smoothed with a Gaussian kernel in the frequency domain, so the cost
+    is O(G log G) in the number of grid cells G rather than quadratic in the
+    number of incidents. Results are cached per dataset version.
+    """
+
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def surface(self, source, data_version, grid_size=DEFAULT_GRID_SIZE,
+                bandwidth_m=DEFAULT_BANDWIDTH_M, category=None, time_of_day=None, region=None):
+        """Return the (cached) density surface for the given parameters.
+
+        `source` is the crime frame, or for data read in pieces a callable
+        returning (frames, extent); it is only called on a cache miss and
+        must already be limited to `region`, which only keys the cache.
+        """
+        key = (data_version, region, grid_size, float(bandwidth_m), category, time_of_day)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key]
+
+        if callable(source):
+            frames, extent = source()
+            result = accumulate_surface(frames, extent, grid_size, bandwidth_m, category, time_of_day)
+        else:
+            result = compute_surface(source, grid_size, bandwidth_m, category, time_of_day)
+
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+        return result
+
+    def hotspots(self, source, data_version, top_n=10, **params):
+        """Return the top-N local maxima of the density surface"""
+        return top_hotspots(self.surface(source, data_version, **params), top_n)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+def frame_extent(df):
+    """Bounding box and mean latitude of a frame's incidents (None if empty)"""
+    if len(df) == 0:
+        return None
+    lats = df['LATITUDE'].to_numpy(dtype=float)
+    lngs = df['LONGITUDE'].to_numpy(dtype=float)
+    return {
+        'min_lat': float(lats.min()),
+        'max_lat': float(lats.max()),
+        'min_lng': float(lngs.min()),
+        'max_lng': float(lngs.max()),
+        'mean_lat': float(np.mean(lats))
+    }
+
+
+def compute_surface(df, grid_size=DEFAULT_GRID_SIZE, bandwidth_m=DEFAULT_BANDWIDTH_M,
+                    category=None, time_of_day=None):
+    """Bin incidents onto a grid and convolve with a Gaussian kernel via FFT"""
+    return accumulate_surface([df], frame_extent(df), grid_size, bandwidth_m, category, time_of_day)
+
+
+def accumulate_surface(frames, extent, grid_size=DEFAULT_GRID_SIZE, bandwidth_m=DEFAULT_BANDWIDTH_M,
+                       category=None, time_of_day=None):
+    """Like compute_surface, but over frames binned one at a time.
+
+    Grid extent covers the whole dataset (`extent`, not the filtered subset)
+    so that surfaces for different filters line up cell for cell.
+    """
+    # Pad the extent by three bandwidths so edge hotspots are not clipped
+    mid_lat = extent['mean_lat'] if extent else 0.0
+    lat_pad = 3 * bandwidth_m / METERS_PER_DEGREE
+    lng_pad = lat_pad / max(np.cos(np.radians(mid_lat)), 1e-6)
+    if extent:
+        min_lat, max_lat = extent['min_lat'] - lat_pad, extent['max_lat'] + lat_pad
+        min_lng, max_lng = extent['min_lng'] - lng_pad, extent['max_lng'] + lng_pad
+    else:
+        min_lat, max_lat, min_lng, max_lng = -lat_pad, lat_pad, -lng_pad, lng_pad
+
+    # Weighted 2D histogram (rows = latitude, cols = longitude)
+    grid = np.zeros((grid_size, grid_size))
+    incident_count = 0
+    for df in frames:
+        mask = np.ones(len(df), dtype=bool)
+        if category:
+            mask &= (df['CATEGORY'] == category).to_numpy()
+        if time_of_day:
+            mask &= (df['TIME_OF_DAY'] == time_of_day).to_numpy()
+
+        part, _, _ = np.histogram2d(
+            df['LATITUDE'].to_numpy(dtype=float)[mask],
+            df['LONGITUDE'].to_numpy(dtype=float)[mask],
+            bins=grid_size,
+            range=[[min_lat, max_lat], [min_lng, max_lng]],
+            weights=df['SEVERITY'].to_numpy(dtype=float)[mask]
+        )
+        grid += part
+        incident_count += int(mask.sum())
+
+    # Cell dimensions in meters
+    cell_h_m = (max_lat - min_lat) / grid_size * METERS_PER_DEGREE
+    cell_w_m = (max_lng - min_lng) / grid_size * METERS_PER_DEGREE * np.cos(np.radians(mid_lat))
+
+    density = gaussian_fft_blur(grid, bandwidth_m / cell_h_m, bandwidth_m / cell_w_m)
+
+    # Express the surface as severity-weighted incidents per square kilometer
+    density *= 1e6 / (cell_h_m * cell_w_m)
+
+    return {
+        'bounds': {
+            'min_lat': float(min_lat),
+            'max_lat': float(max_lat),
+            'min_lng': float(min_lng),
+            'max_lng': float(max_lng)
+        },
+        'grid_size': grid_size,
+        'bandwidth_m': float(bandwidth_m),
+        'cell_height_m': float(cell_h_m),
+        'cell_width_m': float(cell_w_m),
+        'incident_count': incident_count,
+        'density': density
+    }
+
+
+def gaussian_fft_blur(grid, sigma_rows, sigma_cols):
+    """Convolve a grid with a separable Gaussian using the real FFT"""
+    rows, cols = grid.shape
+
+    # Zero-pad by three sigmas on each axis to avoid wrap-around from the
+    # circular convolution
+    pad_rows = rows + int(np.ceil(3 * sigma_rows))
+    pad_cols = cols + int(np.ceil(3 * sigma_cols))
+
+    spectrum = np.fft.rfft2(grid, s=(pad_rows, pad_cols))
+
+    # The Fourier transform of a unit-mass Gaussian is exp(-2 pi^2 sigma^2 f^2)
+    freq_rows = np.fft.fftfreq(pad_rows)
+    freq_cols = np.fft.rfftfreq(pad_cols)
+    transfer = np.exp(-2 * np.pi ** 2 * (
+        (sigma_rows * freq_rows[:, None]) ** 2 + (sigma_cols * freq_cols[None, :]) ** 2
+    ))
+
+    blurred = np.fft.irfft2(spectrum * transfer, s=(pad_rows, pad_cols))[:rows, :cols]
+
+    # Clamp tiny negative values from floating point round-off
+    return np.maximum(blurred, 0.0)
+
+
+def cell_center(surface, row, col):
+    """Return the (lat, lng) at the center of a grid cell"""
+    bounds = surface['bounds']
+    size = surface['grid_size']
+    lat = bounds['min_lat'] + (row + 0.5) * (bounds['max_lat'] - bounds['min_lat']) / size
+    lng = bounds['min_lng'] + (col + 0.5) * (bounds['max_lng'] - bounds['min_lng']) / size
+    return float(lat), float(lng)
+
+
+def top_hotspots(surface, top_n=10):
+    """Return the strongest local maxima of a density surface, ranked"""
+    density = surface['density']
+
+    # A cell is a peak if it is at least as large as all 8 neighbours
+    padded = np.pad(density, 1, mode='constant', constant_values=-np.inf)
+    is_peak = density > 0
+    for dr in (-1, 0, 1):
+        for dc in (-1, 0, 1):
+            if dr == 0 and dc == 0:
+                continue
+            neighbour = padded[1 + dr:1 + dr + density.shape[0], 1 + dc:1 + dc + density.shape[1]]
+            is_peak &= density >= neighbour
+
+    rows, cols = np.nonzero(is_peak)
+    values = density[rows, cols]
+    order = np.argsort(values)[::-1][:top_n]
+
+    max_value = float(density.max()) if density.size else 0.0
+
+    hotspots = []
+    for rank, idx in enumerate(order, start=1):
+        lat, lng = cell_center(surface, rows[idx], cols[idx])
+        value = float(values[idx])
+        hotspots.append({
+            'rank': rank,
+            'lat': lat,
+            'lng': lng,
+            'density': value,
+            'relative_intensity': value / max_value if max_value > 0 else 0.0
+        })
+
+    return hotspots
@@ -0,0 +1,154 @@
+import itertools
+import json
+import queue
+import threading
+
+import numpy as np
+
+from clusters import project
+
+# Zoom levels whose map tiles are reported as invalidated by new incidents
+TILE_ZOOMS = (10, 11, 12, 13, 14)
+
+# Messages buffered per client before it is considered too slow
+CLIENT_QUEUE_SIZE = 100
+
+# Seconds between keep-alive comments on an idle stream
+HEARTBEAT_SECONDS = 15
+
+
+def tile_ids(lats, lngs, zooms=TILE_ZOOMS):
+    """Return the sorted, de-duplicated z/x/y tile ids covering the points"""
+    x, y = project(lats, lngs)
+    tiles = set()
+    for zoom in zooms:
+        scale = 2 ** zoom
+        for tx, ty in zip(np.floor(x * scale).astype(int), np.floor(y * scale).astype(int)):
+            tiles.add((zoom, int(tx), int(ty)))
+    return [f"{zoom}/{tx}/{ty}" for zoom, tx, ty in sorted(tiles)]
+
+
+def in_bbox(incident, bbox):
+    if bbox is None:
+        return True
+    min_lat, min_lng, max_lat, max_lng = bbox
+    return min_lat <= incident['latitude'] <= max_lat and min_lng <= incident['longitude'] <= max_lng
+
+
+class Subscription:
+    """One connected client: a bounded queue of messages for its bounding box"""
+
+    def __init__(self, broker, bbox=None):
+        self.broker = broker
+        self.bbox = bbox
+        self.queue = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.lagging = False
+        self.closed = False
+
+    def offer(self, message):
+        """Queue a message without blocking the publisher"""
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # The client fell behind; drop its backlog and tell it to refetch
+            self.lagging = True
+            with self.queue.mutex:
+                self.queue.queue.clear()
+            self.queue.put_nowait({'event': 'resync', 'data': {'reason': 'client fell behind'}})
+
+    def get(self, timeout=None):
+        """Return the next message, or None if none arrived within timeout"""
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.broker.unsubscribe(self)
+
+
+class LiveBroker:
+    """In-process publisher that fans incident deltas out to subscribers.
+
+    Each subscriber gets only the incidents (and tile invalidations) inside
+    its bounding box, plus the updated global counters. Publishing never
+    blocks: a client whose queue fills up is told to resync instead.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, bbox=None):
+        subscription = Subscription(self, bbox)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, incidents, counters, data_version):
+        """Send a delta for newly added incidents to every subscriber"""
+        message_id = next(self._ids)
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            relevant = [incident for incident in incidents if in_bbox(incident, subscription.bbox)]
+            if relevant:
+                subscription.offer({
+                    'event': 'incidents',
+                    'id': message_id,
+                    'data': {
+                        'data_version': data_version,
+                        'incidents': relevant,
+                        'counters': counters,
+                        'invalidated_tiles': tile_ids(
+                            [incident['latitude'] for incident in relevant],
+                            [incident['longitude'] for incident in relevant]
+                        )
+                    }
+                })
+            else:
+                subscription.offer({
+                    'event': 'counters',
+                    'id': message_id,
+                    'data': {'data_version': data_version, 'counters': counters}
+                })
+
+        return message_id
+
+
+def format_sse(message):
+    """Encode a message as a Server-Sent Events frame"""
+    lines = []
+    if 'id' in message:
+        lines.append(f"id: {message['id']}")
+    lines.append(f"event: {message['event']}")
+    lines.append(f"data: {json.dumps(message['data'])}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def event_stream(subscription, heartbeat=HEARTBEAT_SECONDS):
+    """Yield SSE frames for a subscription until the client disconnects"""
+    try:
+        # Ask browsers to wait a few seconds before reconnecting
+        yield 'retry: 3000\n\n'
+        while not subscription.closed:
+            message = subscription.get(timeout=heartbeat)
+            if message is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield format_sse(message)
+    finally:
+        subscription.close()
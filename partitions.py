@@ -0,0 +1,333 @@
+import argparse
+import itertools
+import importlib.util
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from aggregates import frame_aggregates
+from preprocess import add_derived_columns
+
+# Name of the manifest describing every partition under a partition root
+MANIFEST_NAME = 'manifest.json'
+
+# Default number of partitions kept in memory at once
+DEFAULT_MAX_LOADED = 16
+
+
+def _use_parquet():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _slug(value):
+    return ''.join(ch if ch.isalnum() else '_' for ch in str(value).lower()).strip('_') or 'unknown'
+
+
+def _day(value):
+    """Normalize a date-like value to the YYYY-MM-DD form used in the manifest"""
+    return pd.Timestamp(value).strftime('%Y-%m-%d') if value else None
+
+
+def build_partitions(df, root, region='nyc'):
+    """Split a prepared crime frame into region/year/borough partitions.
+
+    Each partition is written as its own file (Parquet when pyarrow is
+    installed, CSV otherwise) and described in the manifest with its
+    bounding box and date range, so readers can pick partitions without
+    opening them. Existing partitions for other regions are kept.
+    """
+    os.makedirs(root, exist_ok=True)
+    manifest_path = os.path.join(root, MANIFEST_NAME)
+
+    manifest = {'partitions': []}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    manifest['partitions'] = [p for p in manifest['partitions'] if p['region'] != region]
+
+    extension = 'parquet' if _use_parquet() else 'csv'
+
+    for (year, borough), part in df.groupby(['YEAR', 'BOROUGH']):
+        relative_path = os.path.join(_slug(region), str(int(year)), f"{_slug(borough)}.{extension}")
+        path = os.path.join(root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        part = part.reset_index(drop=True)
+        if extension == 'parquet':
+            part.to_parquet(path, index=False)
+        else:
+            part.to_csv(path, index=False)
+
+        manifest['partitions'].append({
+            'region': region,
+            'year': int(year),
+            'borough': str(borough),
+            'path': relative_path,
+            'rows': len(part),
+            'min_lat': float(part['LATITUDE'].min()),
+            'max_lat': float(part['LATITUDE'].max()),
+            'min_lng': float(part['LONGITUDE'].min()),
+            'max_lng': float(part['LONGITUDE'].max()),
+            'start_date': part['DATE'].min().strftime('%Y-%m-%d'),
+            'end_date': part['DATE'].max().strftime('%Y-%m-%d'),
+            'max_crime_id': int(part['CRIME_ID'].max()),
+            'category_counts': {str(k): int(v) for k, v in part['CATEGORY'].value_counts().items()},
+            'aggregates': frame_aggregates(part)
+        })
+
+    manifest['columns'] = [str(column) for column in df.columns]
+    manifest['built_at'] = datetime.now(timezone.utc).isoformat()
+
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+class PartitionStore:
+    """Load only the partitions a query's bounding box and date window touch.
+
+    Partitions are chosen from the manifest metadata and kept in an LRU of
+    at most `max_loaded` frames, so memory follows the working set rather
+    than the size of the archive. Incidents added at runtime are held in a
+    small in-memory overlay and merged into matching queries.
+    """
+
+    def __init__(self, root, max_loaded=DEFAULT_MAX_LOADED):
+        self.root = root
+        self.max_loaded = max_loaded
+
+        with open(os.path.join(root, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+        self.partitions = manifest['partitions']
+        self.columns = manifest.get('columns', [])
+        self.version = manifest.get('built_at', '')
+
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._overlay = None
+        self._aggregates = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def open(cls, root, max_loaded=DEFAULT_MAX_LOADED):
+        """Return a store for root, or None if no partitions were built there"""
+        if not root or not os.path.exists(os.path.join(root, MANIFEST_NAME)):
+            return None
+        return cls(root, max_loaded)
+
+    def select(self, bbox=None, start_date=None, end_date=None, region=None):
+        """Return the manifest entries overlapping the query window"""
+        # Manifest dates compare as text, so both sides must share one format
+        start_date, end_date = _day(start_date), _day(end_date)
+        selected = []
+        for partition in self.partitions:
+            if region and partition['region'] != region:
+                continue
+            if bbox is not None:
+                min_lat, min_lng, max_lat, max_lng = bbox
+                if (partition['max_lat'] < min_lat or partition['min_lat'] > max_lat or
+                        partition['max_lng'] < min_lng or partition['min_lng'] > max_lng):
+                    continue
+            if start_date and partition['end_date'] < start_date:
+                continue
+            if end_date and partition['start_date'] > end_date:
+                continue
+            selected.append(partition)
+        return selected
+
+    def _read(self, partition):
+        path = os.path.join(self.root, partition['path'])
+        if path.endswith('.parquet'):
+            # Memory-map the file so the OS page cache backs the read
+            return pd.read_parquet(path, memory_map=True)
+        return pd.read_csv(path, parse_dates=['DATE'])
+
+    def load(self, partition, cache=True):
+        """Return a partition's frame, reading it on a cache miss.
+
+        Full scans pass cache=False so they do not evict the working set.
+        """
+        key = partition['path']
+        with self._lock:
+            if key in self._loaded:
+                self._loaded.move_to_end(key)
+                self.hits += 1
+                return self._loaded[key]
+
+        frame = self._read(partition)
+
+        with self._lock:
+            self.misses += 1
+            if not cache:
+                return frame
+            self._loaded[key] = frame
+            self._loaded.move_to_end(key)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+
+        return frame
+
+    def append(self, df):
+        """Add runtime incidents to the in-memory overlay"""
+        with self._lock:
+            if self._overlay is None:
+                self._overlay = df.reset_index(drop=True)
+            else:
+                self._overlay = pd.concat([self._overlay, df], ignore_index=True)
+
+    def region_bbox(self, region):
+        """Bounding box of a region's partitions as (min_lat, min_lng, max_lat, max_lng)"""
+        partitions = [partition for partition in self.partitions if partition['region'] == region]
+        if not partitions:
+            return None
+        return (
+            min(partition['min_lat'] for partition in partitions),
+            min(partition['min_lng'] for partition in partitions),
+            max(partition['max_lat'] for partition in partitions),
+            max(partition['max_lng'] for partition in partitions)
+        )
+
+    def overlay(self, region=None):
+        """Incidents added at runtime (None if there are none).
+
+        Runtime incidents carry no region, so a region's share of them is
+        the ones inside the bounding box of its partitions.
+        """
+        with self._lock:
+            overlay = self._overlay
+        if overlay is None or not region:
+            return overlay
+
+        bbox = self.region_bbox(region)
+        if bbox is None:
+            return None
+        min_lat, min_lng, max_lat, max_lng = bbox
+        return overlay[overlay['LATITUDE'].between(min_lat, max_lat) & overlay['LONGITUDE'].between(min_lng, max_lng)]
+
+    def iter_frames(self, bbox=None, start_date=None, end_date=None, region=None, cache=True):
+        """Yield the crimes inside the window one partition at a time, then the overlay"""
+        frames = (self.load(partition, cache) for partition in self.select(bbox, start_date, end_date, region))
+        overlay = self.overlay(region)
+        if overlay is not None:
+            frames = itertools.chain(frames, [overlay])
+
+        for df in frames:
+            # Partitions are coarse, so trim to the exact window
+            mask = pd.Series(True, index=df.index)
+            if bbox is not None:
+                min_lat, min_lng, max_lat, max_lng = bbox
+                mask &= df['LATITUDE'].between(min_lat, max_lat) & df['LONGITUDE'].between(min_lng, max_lng)
+            if start_date:
+                mask &= df['DATE'] >= pd.Timestamp(start_date)
+            if end_date:
+                mask &= df['DATE'] <= pd.Timestamp(end_date)
+            yield df[mask]
+
+    def query(self, bbox=None, start_date=None, end_date=None, region=None):
+        """Return the crimes inside the window from the partitions it touches"""
+        frames = list(self.iter_frames(bbox, start_date, end_date, region))
+        if not frames:
+            return pd.DataFrame(columns=self.columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def aggregates(self, region=None):
+        """Per year/borough aggregate records for the archive (or one region) and the overlay.
+
+        Manifests built before aggregates were recorded get them computed
+        once per partition on first use.
+        """
+        records = []
+        for partition in self.select(region=region):
+            if 'aggregates' in partition:
+                records.extend(partition['aggregates'])
+                continue
+            with self._lock:
+                cached = self._aggregates.get(partition['path'])
+            if cached is None:
+                cached = frame_aggregates(self.load(partition, cache=False))
+                with self._lock:
+                    self._aggregates[partition['path']] = cached
+            records.extend(cached)
+
+        overlay = self.overlay(region)
+        if overlay is not None:
+            records.extend(frame_aggregates(overlay))
+        return records
+
+    def built_at(self):
+        """When the manifest was built, as an aware datetime (None if unknown)"""
+        try:
+            return datetime.fromisoformat(self.version)
+        except ValueError:
+            return None
+
+    def counters(self):
+        """Headline counters for the whole archive, from the manifest and overlay"""
+        totals = {}
+        for partition in self.partitions:
+            for category, count in partition.get('category_counts', {}).items():
+                totals[category] = totals.get(category, 0) + count
+
+        with self._lock:
+            overlay = self._overlay
+        if overlay is not None:
+            for category, count in overlay['CATEGORY'].value_counts().items():
+                totals[category] = totals.get(category, 0) + int(count)
+
+        return {
+            'total_crimes': sum(totals.values()),
+            'violent_crimes': totals.get('Violent Crimes', 0),
+            'property_crimes': totals.get('Property Crimes', 0)
+        }
+
+    def latest_date(self):
+        dates = [pd.Timestamp(partition['end_date']) for partition in self.partitions]
+        with self._lock:
+            if self._overlay is not None and len(self._overlay):
+                dates.append(self._overlay['DATE'].max())
+        return max(dates, default=pd.Timestamp.now())
+
+    def next_crime_id(self):
+        ids = [partition.get('max_crime_id', 0) for partition in self.partitions]
+        with self._lock:
+            if self._overlay is not None and len(self._overlay):
+                ids.append(int(self._overlay['CRIME_ID'].max()))
+        return max(ids, default=9999) + 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'partitions': len(self.partitions),
+                'loaded': len(self._loaded),
+                'max_loaded': self.max_loaded,
+                'loaded_rows': int(sum(len(frame) for frame in self._loaded.values())),
+                'overlay_rows': 0 if self._overlay is None else len(self._overlay),
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Partition crime data by region, year and borough')
+    parser.add_argument('csv', nargs='?', default='crime_data.csv', help='crime CSV to partition')
+    parser.add_argument('--root', default=os.path.join('data', 'partitions'), help='partition directory')
+    parser.add_argument('--region', default='nyc', help='region name for these records')
+    args = parser.parse_args()
+
+    print(f"Partitioning {args.csv} as region '{args.region}'...")
+    # Reuse the application's preprocessing so partitions hold the derived columns
+    df = add_derived_columns(pd.read_csv(args.csv))
+    manifest = build_partitions(df, args.root, args.region)
+
+    partitions = [p for p in manifest['partitions'] if p['region'] == args.region]
+    print(f"Wrote {len(partitions)} partitions ({len(df)} records) to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+import pandas as pd
+
+
+def add_derived_columns(df):
+    """Add the derived time columns used throughout the analysis"""
+    # Convert date to datetime
+    df['DATE'] = pd.to_datetime(df['DATE'])
+    
+    # Create year and month columns for time-based analysis
+    df['YEAR'] = df['DATE'].dt.year
+    df['MONTH'] = df['DATE'].dt.month
+    df['DAY_OF_WEEK'] = df['DATE'].dt.day_name()
+    
+    # Extract hour from time for time-of-day analysis
+    df['HOUR'] = df['TIME'].apply(lambda x: int(x.split(':')[0]))
+    
+    # Create time of day category
+    time_of_day = []
+    for hour in df['HOUR']:
+        if 5 <= hour < 12:
+            time_of_day.append('Morning')
+        elif 12 <= hour < 17:
+            time_of_day.append('Afternoon')
+        elif 17 <= hour < 21:
+            time_of_day.append('Evening')
+        else:
+            time_of_day.append('Night')
+    
+    df['TIME_OF_DAY'] = time_of_day
+    
+    return df
@@ -0,0 +1,112 @@
+from functools import lru_cache
+
+import numpy as np
+
+# Default half-life of an incident's influence on the score, in days
+DEFAULT_HALF_LIFE_DAYS = 365
+
+# Ages beyond this many days all share the last decay table entry
+MAX_AGE_DAYS = 20 * 365
+
+# Spread of the hour-of-day similarity kernel, in hours
+HOUR_SIGMA = 2.0
+
+# Share of an incident's weight kept even at a very different time of day
+TIME_FLOOR = 0.25
+
+# Maximum deductions, and the per-unit deduction rates of the simple model
+COUNT_CAP, COUNT_RATE = 60, 3
+SEVERITY_CAP, SEVERITY_RATE = 20, 0.5
+VIOLENT_CAP, VIOLENT_RATE = 20, 5
+
+DAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+DAY_INDEX = {day: i for i, day in enumerate(DAYS)}
+
+
+def _hour_table():
+    """24x24 circular Gaussian similarity between hours of the day"""
+    hours = np.arange(24)
+    diff = np.abs(hours[:, None] - hours[None, :])
+    diff = np.minimum(diff, 24 - diff)
+    return np.exp(-diff ** 2 / (2 * HOUR_SIGMA ** 2))
+
+
+def _day_table():
+    """7x7 similarity between days: same day, same weekday/weekend class, other"""
+    weekend = np.array([day >= 5 for day in range(7)])
+    table = np.where(weekend[:, None] == weekend[None, :], 0.7, 0.4)
+    np.fill_diagonal(table, 1.0)
+    return table
+
+
+HOUR_SIMILARITY = _hour_table()
+DAY_SIMILARITY = _day_table()
+
+
+@lru_cache(maxsize=16)
+def decay_table(half_life_days=DEFAULT_HALF_LIFE_DAYS):
+    """Exponential recency weights indexed by age in days"""
+    ages = np.arange(MAX_AGE_DAYS + 1)
+    table = 0.5 ** (ages / float(half_life_days))
+    table.setflags(write=False)
+    return table
+
+
+def incident_weights(dates, hours, days, departure, reference_date,
+                     half_life_days=DEFAULT_HALF_LIFE_DAYS):
+    """Weight each incident by recency and by similarity to the departure time.
+
+    dates are numpy datetime64[D] values, hours 0-23 and days 0-6 (Monday
+    first); incidents dated after reference_date get weight 0. All lookups
+    are table gathers, so the cost is a few vectorized passes over the
+    matched set.
+    """
+    ages = (np.datetime64(reference_date, 'D') - dates).astype(int)
+    recency = decay_table(half_life_days)[np.clip(ages, 0, MAX_AGE_DAYS)]
+
+    # Incidents after the reference date had not happened yet at that time
+    recency = np.where(ages < 0, 0.0, recency)
+
+    similarity = HOUR_SIMILARITY[hours, departure.hour] * DAY_SIMILARITY[days, departure.weekday()]
+
+    return recency * (TIME_FLOOR + (1 - TIME_FLOOR) * similarity)
+
+
+def _saturate(value, cap, rate):
+    """Smooth replacement for min(cap, value * rate) with the same initial slope"""
+    return cap * (1 - np.exp(-value * rate / cap))
+
+
+def weighted_safety_score(crimes, departure, reference_date,
+                          half_life_days=DEFAULT_HALF_LIFE_DAYS):
+    """Route safety score from time-decayed, time-of-travel weighted crimes.
+
+    Mirrors the simple model (count, severity and violent deductions from
+    100) but counts each crime by its weight and saturates smoothly rather
+    than at hard caps. Returns the score and the weighted totals.
+    """
+    if not crimes:
+        return 100.0, {'weighted_count': 0.0, 'weighted_severity': 0.0, 'weighted_violent': 0.0}
+
+    dates = np.array([crime['date'] for crime in crimes], dtype='datetime64[D]')
+    hours = np.array([crime['hour'] for crime in crimes], dtype=int)
+    days = np.array([DAY_INDEX.get(crime['day_of_week'], 0) for crime in crimes], dtype=int)
+    severity = np.array([crime['severity'] for crime in crimes], dtype=float)
+    violent = np.array([crime['category'] == 'Violent Crimes' for crime in crimes], dtype=float)
+
+    weights = incident_weights(dates, hours, days, departure, reference_date, half_life_days)
+
+    weighted_count = float(weights.sum())
+    weighted_severity = float((weights * severity).sum())
+    weighted_violent = float((weights * violent).sum())
+
+    score = 100.0
+    score -= _saturate(weighted_count, COUNT_CAP, COUNT_RATE)
+    score -= _saturate(weighted_severity, SEVERITY_CAP, SEVERITY_RATE)
+    score -= _saturate(weighted_violent, VIOLENT_CAP, VIOLENT_RATE)
+
+    return round(float(score), 1), {
+        'weighted_count': round(weighted_count, 3),
+        'weighted_severity': round(weighted_severity, 3),
+        'weighted_violent': round(weighted_violent, 3)
+    }
@@ -14,6 +14,9 @@ let routeLine = null;
 let crimeMarkers = [];
 let clusterGroup = null;
 
+// Server-side clusters for the current route result
+let routeResult = null;
+
 // Initialize charts
 let timeSeriesChart = null;
 let crimeTypeChart = null;
@@ -52,6 +55,35 @@ function loadDataSummary() {
     });
 }
 
+// Function to subscribe to incident updates pushed by the server
+function subscribeLiveUpdates() {
+    if (!window.EventSource) return;
+    
+    const source = new EventSource('/api/live');
+    
+    // Both incident and counter messages carry the updated totals
+    const updateCounters = event => {
+        const counters = JSON.parse(event.data).counters;
+        document.getElementById('total-crimes').textContent = counters.total_crimes.toLocaleString();
+        document.getElementById('violent-crimes').textContent = counters.violent_crimes.toLocaleString();
+        document.getElementById('property-crimes').textContent = counters.property_crimes.toLocaleString();
+    };
+    
+    source.addEventListener('incidents', updateCounters);
+    source.addEventListener('counters', updateCounters);
+    
+    // The server dropped updates for us, so refetch the full summary
+    source.addEventListener('resync', loadDataSummary);
+    
+    // The browser gives up if the server turns the stream away (e.g. 503
+    // when too many clients are connected), so try again later ourselves
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            setTimeout(subscribeLiveUpdates, 30000);
+        }
+    };
+}
+
 // Function to geocode an address (convert address to coordinates)
 function geocodeAddress(address) {
     return new Promise((resolve, reject) => {
@@ -89,7 +121,8 @@ function clearMap() {
     
     // Remove cluster group if exists
     if (clusterGroup) map.removeLayer(clusterGroup);
-    clusterGroup = L.markerClusterGroup();
+    clusterGroup = L.layerGroup();
+    routeResult = null;
 }
 
 // Function to analyze the route and display results
@@ -185,7 +218,8 @@ function analyzeRoute() {
                         from_lng: fromCoords[1],
                         to_lat: toCoords[0],
                         to_lng: toCoords[1],
-                        route_coordinates: routeCoordinates
+                        route_coordinates: routeCoordinates,
+                        cluster: true
                     })
                 });
             })
@@ -226,7 +260,8 @@ function analyzeRoute() {
                         from_lat: fromCoords[0],
                         from_lng: fromCoords[1],
                         to_lat: toCoords[0],
-                        to_lng: toCoords[1]
+                        to_lng: toCoords[1],
+                        cluster: true
                     })
                 })
                 .then(response => {
@@ -277,69 +312,13 @@ function analyzeRoute() {
         }
         
         // Update crime statistics
-        document.getElementById('crime-count').textContent = data.crimes.length;
+        document.getElementById('crime-count').textContent = data.crime_count;
         
-        // Initialize cluster group for crime markers
-        clusterGroup = L.markerClusterGroup({
-            maxClusterRadius: 30,
-            iconCreateFunction: function(cluster) {
-                const count = cluster.getChildCount();
-                let size = 'small';
-                if (count > 10) size = 'medium';
-                if (count > 20) size = 'large';
-                
-                return L.divIcon({
-                    html: `<div class="cluster-icon cluster-${size}">${count}</div>`,
-                    className: 'custom-cluster-icon',
-                    iconSize: L.point(40, 40)
-                });
-            }
-        });
-        
-        // Process each crime
-        data.crimes.forEach(crime => {
-            // Create marker for each crime
-            const markerIcon = L.divIcon({
-                className: 'custom-div-icon',
-                html: `<div class="crime-marker ${crime.category === 'Violent Crimes' ? 'violent-marker' : 'property-marker'}" style="width:20px;height:20px;font-size:12px;">${crime.severity}</div>`,
-                iconSize: [20, 20],
-                iconAnchor: [10, 10]
-            });
-            
-            const marker = L.marker([crime.latitude, crime.longitude], { 
-                icon: markerIcon,
-                title: crime.crime_type
-            });
-            
-            // Create popup content
-            let severityClass = 'severity-low';
-            if (crime.severity >= 7) {
-                severityClass = 'severity-high';
-            } else if (crime.severity >= 4) {
-                severityClass = 'severity-medium';
-            }
-            
-            let popupContent = `
-                <div class="crime-popup">
-                    <h3>${crime.crime_type}</h3>
-                    <p><strong>Date:</strong> ${crime.date}</p>
-                    <p><strong>Time:</strong> ${crime.time} (${crime.time_of_day})</p>
-                    <p><strong>Location:</strong> ${crime.street_address}, ${crime.neighborhood}, ${crime.borough}</p>
-                    <p><strong>Category:</strong> ${crime.category}</p>
-                    <p><strong>Status:</strong> ${crime.status}</p>
-                    <p><strong>Severity:</strong> <span class="severity ${severityClass}">${crime.severity}/10</span></p>
-                    ${crime.victims > 0 ? `<p><strong>Victims:</strong> ${crime.victims}</p>` : ''}
-                    ${crime.property_damage > 0 ? `<p><strong>Property Damage:</strong> $${crime.property_damage.toLocaleString()}</p>` : ''}
-                </div>
-            `;
-            
-            marker.bindPopup(popupContent);
-            crimeMarkers.push(marker);
-            clusterGroup.addLayer(marker);
-        });
-        
-        // Add cluster group to map
+        // Draw the server-side clusters for the current zoom level
+        routeResult = data;
+        routeResult.pending = {};
         map.addLayer(clusterGroup);
+        renderRouteClusters();
         
         // Update crime statistics if available
         if (data.crime_stats && Object.keys(data.crime_stats).length > 0) {
@@ -372,6 +351,146 @@ function analyzeRoute() {
     });
 }
 
+// Function to build the popup content for a single crime
+function crimePopupContent(crime) {
+    let severityClass = 'severity-low';
+    if (crime.severity >= 7) {
+        severityClass = 'severity-high';
+    } else if (crime.severity >= 4) {
+        severityClass = 'severity-medium';
+    }
+    
+    return `
+        <div class="crime-popup">
+            <h3>${crime.crime_type}</h3>
+            <p><strong>Date:</strong> ${crime.date}</p>
+            <p><strong>Time:</strong> ${crime.time} (${crime.time_of_day})</p>
+            <p><strong>Location:</strong> ${crime.street_address}, ${crime.neighborhood}, ${crime.borough}</p>
+            <p><strong>Category:</strong> ${crime.category}</p>
+            <p><strong>Status:</strong> ${crime.status}</p>
+            <p><strong>Severity:</strong> <span class="severity ${severityClass}">${crime.severity}/10</span></p>
+            ${crime.victims > 0 ? `<p><strong>Victims:</strong> ${crime.victims}</p>` : ''}
+            ${crime.property_damage > 0 ? `<p><strong>Property Damage:</strong> $${crime.property_damage.toLocaleString()}</p>` : ''}
+        </div>
+    `;
+}
+
+// Function to fetch a page of a cluster's crimes from the server
+function fetchClusterMembers(cluster, limit) {
+    return fetch(`/api/crimes/clusters/${routeResult.result_id}/${cluster.id}?limit=${limit}`)
+    .then(response => {
+        if (!response.ok) {
+            throw new Error(`HTTP error! Status: ${response.status}`);
+        }
+        return response.json();
+    });
+}
+
+// Function to create a marker for a cluster holding a single crime
+function createCrimeMarker(cluster) {
+    const isViolent = cluster.violent > 0;
+    const markerIcon = L.divIcon({
+        className: 'custom-div-icon',
+        html: `<div class="crime-marker ${isViolent ? 'violent-marker' : 'property-marker'}" style="width:20px;height:20px;font-size:12px;">${Math.round(cluster.avg_severity)}</div>`,
+        iconSize: [20, 20],
+        iconAnchor: [10, 10]
+    });
+    
+    const marker = L.marker([cluster.lat, cluster.lng], { icon: markerIcon });
+    
+    // Load the crime details only when the popup is opened
+    marker.bindPopup('Loading...');
+    marker.on('popupopen', () => {
+        fetchClusterMembers(cluster, 1)
+        .then(data => marker.setPopupContent(crimePopupContent(data.members[0])))
+        .catch(error => {
+            console.error('Error loading crime details:', error);
+            marker.setPopupContent('Could not load crime details.');
+        });
+    });
+    
+    return marker;
+}
+
+// Function to create a marker for a cluster of several crimes
+function createClusterMarker(cluster, zoom) {
+    let size = 'small';
+    if (cluster.count > 10) size = 'medium';
+    if (cluster.count > 20) size = 'large';
+    
+    const marker = L.marker([cluster.lat, cluster.lng], {
+        icon: L.divIcon({
+            html: `<div class="cluster-icon cluster-${size}">${cluster.count}</div>`,
+            className: 'custom-cluster-icon',
+            iconSize: L.point(40, 40)
+        }),
+        title: `${cluster.count} crimes (${cluster.severity_mix.high} high severity)`
+    });
+    
+    marker.on('click', () => {
+        if (zoom < routeResult.max_zoom) {
+            // Zoom in so the cluster splits into its children
+            const targetZoom = Math.max(zoom + 1, Math.min(map.getBoundsZoom(cluster.bounds), routeResult.max_zoom));
+            map.setView([cluster.lat, cluster.lng], targetZoom);
+            return;
+        }
+        
+        // At the deepest level, list the crimes in a popup
+        fetchClusterMembers(cluster, 50)
+        .then(data => {
+            const items = data.members.map(crime => crimePopupContent(crime)).join('');
+            const more = data.total_members > data.members.length
+                ? `<p>and ${data.total_members - data.members.length} more</p>` : '';
+            L.popup({ maxHeight: 300 })
+                .setLatLng([cluster.lat, cluster.lng])
+                .setContent(items + more)
+                .openOn(map);
+        })
+        .catch(error => console.error('Error loading cluster members:', error));
+    });
+    
+    return marker;
+}
+
+// Function to draw the route's clusters for the current zoom level
+function renderRouteClusters() {
+    if (!routeResult || !clusterGroup) return;
+    
+    const zoom = Math.min(Math.max(map.getZoom(), routeResult.min_zoom), routeResult.max_zoom);
+    const clusters = routeResult.clusters[zoom];
+    
+    // Dense levels are not sent inline, so fetch them on demand
+    if (!clusters) {
+        if (routeResult.pending[zoom]) return;
+        routeResult.pending[zoom] = true;
+        
+        const result = routeResult;
+        fetch(`/api/crimes/clusters/${result.result_id}/${zoom}`)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`HTTP error! Status: ${response.status}`);
+            }
+            return response.json();
+        })
+        .then(data => {
+            result.clusters[zoom] = data.clusters;
+            renderRouteClusters();
+        })
+        .catch(error => console.error('Error loading clusters:', error))
+        .finally(() => { result.pending[zoom] = false; });
+        return;
+    }
+    
+    clusterGroup.clearLayers();
+    crimeMarkers = clusters.map(cluster =>
+        cluster.count === 1 ? createCrimeMarker(cluster) : createClusterMarker(cluster, zoom)
+    );
+    crimeMarkers.forEach(marker => clusterGroup.addLayer(marker));
+}
+
+// Redraw route clusters whenever the zoom level changes
+map.on('zoomend', renderRouteClusters);
+
 // Function to update crime statistics in the UI
 function updateCrimeStatistics(crimeStats) {
     // Update crime types list
@@ -697,6 +816,9 @@ document.addEventListener('DOMContentLoaded', function() {
     // Load data summary and initialize dashboard
     loadDataSummary();
     
+    // Keep the dashboard counters up to date
+    subscribeLiveUpdates();
+    
     // Add event listener to the analyze button
     document.getElementById('analyze-btn').addEventListener('click', analyzeRoute);
     
@@ -0,0 +1,41 @@
+import threading
+import time
+
+from admission import SingleFlight
+
+
+def test_single_flight_propagates_errors_to_followers():
+    flight = SingleFlight()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fail():
+        calls.append(1)
+        started.set()
+        release.wait()
+        raise RuntimeError('boom')
+
+    errors = []
+
+    def call():
+        try:
+            flight.do('key', fail)
+        except RuntimeError as e:
+            errors.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=call) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    # Let the followers reach the wait on the leader's call
+    time.sleep(0.2)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert errors == ['boom'] * 4
+    assert flight.in_flight() == 0
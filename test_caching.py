@@ -0,0 +1,75 @@
+from flask import Flask, jsonify, request
+
+import app as app_module
+from caching import DATASET_POLICY, PINNED_POLICY, conditional
+
+state = {'version': 'abc', 'calls': 0}
+
+demo = Flask(__name__)
+
+
+@demo.route('/items')
+@conditional(lambda: state['version'])
+def items():
+    state['calls'] += 1
+    if request.args.get('fail'):
+        return jsonify({'error': 'bad request'}), 400
+    return jsonify({'items': [1, 2, 3]})
+
+
+def test_matching_etag_skips_the_view():
+    client = demo.test_client()
+    first = client.get('/items')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    calls = state['calls']
+    for validator in (etag, 'W/' + etag, f'"other", {etag}'):
+        response = client.get('/items', headers={'If-None-Match': validator})
+        assert response.status_code == 304
+        assert response.headers['ETag'] == etag
+    assert state['calls'] == calls
+
+    assert client.get('/items', headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_pinned_version_is_immutable():
+    client = demo.test_client()
+    assert client.get('/items').headers['Cache-Control'] == DATASET_POLICY
+    assert client.get('/items?v=old').headers['Cache-Control'] == DATASET_POLICY
+
+    response = client.get(f"/items?v={state['version']}")
+    assert response.headers['Cache-Control'] == PINNED_POLICY
+    # The pin does not change the representation, so it shares the ETag
+    assert response.headers['ETag'] == client.get('/items').headers['ETag']
+
+
+def test_errors_are_not_cached():
+    response = demo.test_client().get('/items?fail=1')
+    assert response.status_code == 400
+    for header in ('ETag', 'Last-Modified', 'X-Data-Version'):
+        assert header not in response.headers
+    assert response.headers.get('Cache-Control') != DATASET_POLICY
+
+
+def test_ingest_changes_the_etag(monkeypatch):
+    monkeypatch.setattr(app_module, 'ingest_token', 'secret')
+    for name in ('crime_data', 'ingest_digest', 'data_version', 'data_updated_at'):
+        monkeypatch.setattr(app_module, name, getattr(app_module, name))
+    client = app_module.app.test_client()
+
+    before = client.get('/api/data-summary')
+    etag = before.headers['ETag']
+    assert client.get('/api/data-summary', headers={'If-None-Match': etag}).status_code == 304
+
+    response = client.post('/api/incidents', headers={'Authorization': 'Bearer secret'}, json={
+        'date': '2024-01-02', 'time': '10:30', 'latitude': 40.71, 'longitude': -74.0,
+        'category': 'Violent Crimes', 'crime_type': 'Assault', 'severity': 5
+    })
+    assert response.status_code == 201
+
+    after = client.get('/api/data-summary', headers={'If-None-Match': etag})
+    assert after.status_code == 200
+    assert after.headers['ETag'] != etag
+    assert after.headers['X-Data-Version'] == response.get_json()['data_version']
+    assert after.get_json()['total_crimes'] == before.get_json()['total_crimes'] + 1
@@ -0,0 +1,23 @@
+import numpy as np
+
+from clusters import ClusterIndex
+
+
+def test_clusters_nest_across_zooms():
+    rng = np.random.default_rng(0)
+    crimes = [{
+        'latitude': float(lat),
+        'longitude': float(lng),
+        'severity': int(severity),
+        'category': 'Violent Crimes' if severity > 6 else 'Property Crimes'
+    } for lat, lng, severity in zip(rng.uniform(40.6, 40.8, 500), rng.uniform(-74.05, -73.85, 500),
+                                    rng.integers(1, 11, 500))]
+    index = ClusterIndex(crimes)
+
+    for zoom in range(index.min_zoom, index.max_zoom):
+        assert sum(cluster['count'] for cluster in index.levels[zoom]) == len(crimes)
+        for cluster in index.levels[zoom]:
+            _, cx, cy = (int(part) for part in cluster['id'].split('/'))
+            children = index.children(zoom, cx, cy)
+            assert sum(child['count'] for child in children) == cluster['count']
+            assert sum(child['violent'] for child in children) == cluster['violent']
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import export
+from export import Exporter, parse_range
+
+
+def test_parse_range():
+    assert parse_range('bytes=0-9', 100) == (0, 9)
+    assert parse_range('bytes=90-', 100) == (90, 99)
+    assert parse_range('bytes=50-500', 100) == (50, 99)
+    assert parse_range('bytes=-10', 100) == (90, 99)
+    assert parse_range('bytes=-500', 100) == (0, 99)
+    assert parse_range('items=0-9', 100) is None
+    assert parse_range('bytes=0-1,5-6', 100) is None
+    for header in ('bytes=100-', 'bytes=9-3', 'bytes=-0'):
+        with pytest.raises(ValueError):
+            parse_range(header, 100)
+
+
+def _export_frame(rows):
+    return pd.DataFrame({
+        'CRIME_ID': np.arange(rows),
+        'DATE': pd.date_range('2023-01-01', periods=rows, freq='D'),
+        'CATEGORY': ['Violent Crimes', 'Property Crimes'] * (rows // 2) + ['Other'] * (rows % 2),
+        'SEVERITY': np.arange(rows) % 10 + 1
+    })
+
+
+@pytest.mark.parametrize('fmt', ['csv', 'ndjson'])
+def test_stream_ranges_match_full_export(monkeypatch, fmt):
+    monkeypatch.setattr(export, 'CHUNK_ROWS', 3)
+    df = _export_frame(20)
+    indices = np.arange(len(df))[::-1]
+    exporter = Exporter()
+
+    parts = [(df, indices[:8]), (df.iloc[:0], indices[:0]), (df, indices[8:])]
+
+    full = b''.join(exporter.stream(parts, fmt, 'key'))
+    sizes = exporter.chunk_sizes('key')
+    assert sizes is not None and len(sizes) == 7 and sum(sizes) == len(full)
+    assert full == b''.join(Exporter().stream([(df, indices)], fmt, 'other'))
+
+    total = len(full)
+    for header in ('bytes=0-0', 'bytes=5-40', f'bytes={sizes[0]}-', f'bytes={sizes[0] + sizes[1] + 2}-{total - 3}',
+                   'bytes=-1', 'bytes=-25', f'bytes={total - 1}-'):
+        start, end = parse_range(header, total)
+        assert b''.join(exporter.stream(parts, fmt, 'key', start, end)) == full[start:end + 1]
+
+
+def test_interrupted_stream_keeps_partial_index(monkeypatch):
+    monkeypatch.setattr(export, 'CHUNK_ROWS', 3)
+    df = _export_frame(20)
+    parts = [(df, np.arange(len(df)))]
+    full = b''.join(Exporter().stream(parts, 'csv', 'key'))
+
+    exporter = Exporter()
+    stream = exporter.stream(parts, 'csv', 'key')
+    next(stream)
+    next(stream)
+    stream.close()
+    assert exporter.chunk_sizes('key') is None
+
+    rendered = []
+    render = export.render_chunk
+    monkeypatch.setattr(export, 'render_chunk', lambda frame, *args: rendered.append(1) or render(frame, *args))
+
+    # Only the chunks the interrupted download did not reach are rendered
+    sizes = exporter.measure(parts, 'csv', 'key')
+    assert len(rendered) == len(sizes) - 2
+    assert sum(sizes) == len(full)
+    assert exporter.chunk_sizes('key') == sizes
+
+    start, end = parse_range('bytes=30-', len(full))
+    assert b''.join(exporter.stream(parts, 'csv', 'key', start, end)) == full[30:]
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import app
+from hotspots import compute_surface, top_hotspots
+
+
+def _crimes(lats, lngs, severity):
+    n = len(lats)
+    return pd.DataFrame({
+        'LATITUDE': lats,
+        'LONGITUDE': lngs,
+        'SEVERITY': severity,
+        'CATEGORY': ['Violent Crimes'] * n,
+        'TIME_OF_DAY': ['Night'] * n
+    })
+
+
+def test_surface_keeps_its_mass():
+    rng = np.random.default_rng(1)
+    df = _crimes(rng.uniform(40.6, 40.8, 400), rng.uniform(-74.0, -73.8, 400), rng.integers(1, 11, 400))
+    surface = compute_surface(df, grid_size=128, bandwidth_m=300)
+
+    cell_area_km2 = surface['cell_height_m'] * surface['cell_width_m'] / 1e6
+    assert surface['density'].sum() * cell_area_km2 == pytest.approx(df['SEVERITY'].sum(), rel=1e-3)
+    assert surface['incident_count'] == len(df)
+
+
+def test_top_hotspot_finds_planted_cluster():
+    rng = np.random.default_rng(2)
+    background = 300
+    lats = np.concatenate([rng.uniform(40.6, 40.8, background), rng.normal(40.7123, 0.0005, 60)])
+    lngs = np.concatenate([rng.uniform(-74.0, -73.8, background), rng.normal(-73.9012, 0.0005, 60)])
+    surface = compute_surface(_crimes(lats, lngs, np.full(len(lats), 5)), grid_size=128, bandwidth_m=200)
+
+    top = top_hotspots(surface, 1)[0]
+    assert top['rank'] == 1 and top['relative_intensity'] == 1.0
+    assert abs(top['lat'] - 40.7123) < 0.003 and abs(top['lng'] - -73.9012) < 0.003
+
+
+@pytest.mark.parametrize('query', [
+    'grid_size=4', 'grid_size=1024', 'bandwidth=0', 'bandwidth=-5', 'bandwidth=nan', 'bandwidth=inf', 'bandwidth=1e9'
+])
+def test_hotspot_parameter_bounds(query):
+    client = app.test_client()
+    for path in ('/api/hotspots', '/api/hotspots/grid'):
+        response = client.get(f'{path}?{query}')
+        assert response.status_code == 400
+        assert 'error' in response.get_json()
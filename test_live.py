@@ -0,0 +1,117 @@
+import json
+
+import pytest
+
+import app as app_module
+from live import CLIENT_QUEUE_SIZE, LiveBroker, event_stream
+
+INSIDE = {'latitude': 40.71, 'longitude': -74.0}
+OUTSIDE = {'latitude': 40.85, 'longitude': -73.85}
+COUNTERS = {'total_crimes': 2, 'violent_crimes': 1, 'property_crimes': 1}
+
+
+def test_publish_filters_by_bbox():
+    broker = LiveBroker()
+    near = broker.subscribe([40.70, -74.01, 40.72, -73.99])
+    far = broker.subscribe([41.0, -73.0, 41.1, -72.9])
+    everyone = broker.subscribe()
+
+    broker.publish([INSIDE, OUTSIDE], COUNTERS, 'v1')
+
+    message = near.get(timeout=0)
+    assert message['event'] == 'incidents'
+    assert message['data']['incidents'] == [INSIDE]
+    assert message['data']['counters'] == COUNTERS
+    assert message['data']['invalidated_tiles']
+
+    message = far.get(timeout=0)
+    assert message['event'] == 'counters'
+    assert message['data'] == {'data_version': 'v1', 'counters': COUNTERS}
+
+    assert everyone.get(timeout=0)['data']['incidents'] == [INSIDE, OUTSIDE]
+
+
+def test_slow_client_is_told_to_resync():
+    broker = LiveBroker()
+    subscription = broker.subscribe()
+    for _ in range(CLIENT_QUEUE_SIZE + 1):
+        broker.publish([INSIDE], COUNTERS, 'v1')
+
+    assert subscription.lagging
+    assert subscription.get(timeout=0)['event'] == 'resync'
+    assert subscription.get(timeout=0) is None
+
+
+def test_event_stream_frames_and_unsubscribes():
+    broker = LiveBroker()
+    subscription = broker.subscribe()
+    stream = event_stream(subscription, heartbeat=0.01)
+
+    assert next(stream) == 'retry: 3000\n\n'
+    assert next(stream) == ': keep-alive\n\n'
+
+    message_id = broker.publish([INSIDE], COUNTERS, 'v1')
+    frame = next(stream)
+    lines = frame.rstrip('\n').split('\n')
+    assert frame.endswith('\n\n')
+    assert lines[0] == f'id: {message_id}'
+    assert lines[1] == 'event: incidents'
+    assert json.loads(lines[2][len('data: '):])['incidents'] == [INSIDE]
+
+    stream.close()
+    assert subscription.closed
+    assert broker.subscriber_count() == 0
+
+
+INCIDENT = {
+    'date': '2024-01-02',
+    'time': '10:30',
+    'latitude': 40.71,
+    'longitude': -74.0,
+    'category': 'Violent Crimes',
+    'crime_type': 'Assault',
+    'severity': 5
+}
+
+
+def test_ingest_requires_token(monkeypatch):
+    client = app_module.app.test_client()
+
+    monkeypatch.setattr(app_module, 'ingest_token', None)
+    assert client.post('/api/incidents', json=INCIDENT, headers={'Authorization': 'Bearer x'}).status_code == 403
+
+    monkeypatch.setattr(app_module, 'ingest_token', 'secret')
+    assert client.post('/api/incidents', json=INCIDENT).status_code == 401
+    assert client.post('/api/incidents', json=INCIDENT, headers={'Authorization': 'Bearer wrong'}).status_code == 401
+
+
+@pytest.mark.parametrize('field, value', [
+    ('latitude', 'nan'), ('latitude', 91), ('latitude', 'inf'), ('longitude', -181), ('longitude', 'nan')
+])
+def test_ingest_rejects_bad_coordinates(monkeypatch, field, value):
+    monkeypatch.setattr(app_module, 'ingest_token', 'secret')
+    response = app_module.app.test_client().post(
+        '/api/incidents', json=dict(INCIDENT, **{field: value}), headers={'Authorization': 'Bearer secret'}
+    )
+    assert response.status_code == 400
+
+
+def test_ingest_publishes_to_subscribers(monkeypatch):
+    monkeypatch.setattr(app_module, 'ingest_token', 'secret')
+    # Restore the dataset afterwards so other tests see the original rows
+    for name in ('crime_data', 'ingest_digest', 'data_version', 'data_updated_at'):
+        monkeypatch.setattr(app_module, name, getattr(app_module, name))
+    subscription = app_module.live_broker.subscribe([40.70, -74.01, 40.72, -73.99])
+    try:
+        response = app_module.app.test_client().post(
+            '/api/incidents', json=INCIDENT, headers={'Authorization': 'Bearer secret'}
+        )
+        assert response.status_code == 201
+        added = response.get_json()['added']
+
+        message = subscription.get(timeout=1)
+        assert message['event'] == 'incidents'
+        assert message['data']['incidents'] == added
+        assert message['data']['data_version'] == response.get_json()['data_version']
+    finally:
+        subscription.close()
@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+
+from aggregates import crime_trends, data_summary, frame_aggregates
+from partitions import PartitionStore, build_partitions
+from preprocess import add_derived_columns
+
+
+@pytest.fixture(scope='module')
+def crimes():
+    return add_derived_columns(pd.read_csv('crime_data.csv'))
+
+
+@pytest.fixture
+def store(tmp_path, crimes):
+    build_partitions(crimes, tmp_path, 'nyc')
+    # A second, far away region with the same shape of data
+    build_partitions(_shifted(crimes), tmp_path, 'la')
+    return PartitionStore(tmp_path, max_loaded=2)
+
+
+def _shifted(df):
+    return df.assign(LATITUDE=df['LATITUDE'] - 6.7, LONGITUDE=df['LONGITUDE'] - 44.3, CRIME_ID=df['CRIME_ID'] + 100000)
+
+
+def test_select_prunes_by_bbox_date_and_region(store, crimes):
+    everything = store.select()
+    assert sum(partition['rows'] for partition in everything) == 2 * len(crimes)
+
+    nyc = store.select(region='nyc')
+    assert nyc and all(partition['region'] == 'nyc' for partition in nyc)
+    assert sum(partition['rows'] for partition in nyc) == len(crimes)
+
+    # A bbox around New York never touches the Los Angeles partitions
+    bbox = (40.4, -74.3, 41.0, -73.6)
+    assert {partition['region'] for partition in store.select(bbox)} == {'nyc'}
+
+    year = int(crimes['YEAR'].max())
+    dated = store.select(start_date=f'{year}-01-01T00:00')
+    assert dated and all(partition['year'] == year for partition in dated)
+    assert store.select(end_date='1990-01-01') == []
+
+
+def test_lru_evicts_at_max_loaded(store):
+    partitions = store.select(region='nyc')[:3]
+    for partition in partitions:
+        store.load(partition)
+    assert store.stats()['loaded'] == 2
+    assert store.stats()['misses'] == 3
+
+    store.load(partitions[2])
+    assert store.stats()['hits'] == 1
+    store.load(partitions[0])
+    assert store.stats()['misses'] == 4
+
+    # Scans read without caching
+    store.load(store.select(region='la')[0], cache=False)
+    assert store.stats()['loaded'] == 2
+    assert partitions[0]['path'] in store._loaded
+
+
+def test_overlay_is_merged_into_query(store, crimes):
+    added = crimes.iloc[:2].assign(CRIME_ID=[900001, 900002], DATE=pd.Timestamp('2030-05-01'), YEAR=2030)
+    store.append(added)
+
+    result = store.query(start_date='2030-01-01')
+    assert sorted(result['CRIME_ID']) == [900001, 900002]
+
+    bbox = (40.4, -74.3, 41.0, -73.6)
+    assert len(store.query(bbox, region='nyc')) == len(crimes) + 2
+    assert len(store.query(region='la')) == len(crimes)
+    assert store.counters()['total_crimes'] == 2 * len(crimes) + 2
+    assert store.next_crime_id() == 900003
+
+
+def test_aggregates_match_frame_aggregates(store, crimes):
+    added = crimes.iloc[:3].assign(CRIME_ID=[900001, 900002, 900003])
+    store.append(added)
+
+    expected = frame_aggregates(pd.concat([crimes, added, _shifted(crimes)], ignore_index=True))
+    assert data_summary(store.aggregates()) == data_summary(expected)
+    assert crime_trends(store.aggregates()) == crime_trends(expected)
+
+    expected = frame_aggregates(pd.concat([crimes, added], ignore_index=True))
+    assert data_summary(store.aggregates('nyc')) == data_summary(expected)
+    assert crime_trends(store.aggregates('nyc')) == crime_trends(expected)
+
+
+def test_aggregates_for_manifests_without_them(store, crimes):
+    for partition in store.partitions:
+        del partition['aggregates']
+    assert crime_trends(store.aggregates('nyc')) == crime_trends(frame_aggregates(crimes))
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import app
+from scoring import HOUR_SIMILARITY, incident_weights, weighted_safety_score
+
+REFERENCE = pd.Timestamp('2024-06-30')
+DEPARTURE = pd.Timestamp('2024-07-01 08:00')  # a Monday
+
+
+def _weights(dates, hours, half_life_days=30):
+    dates = np.array(dates, dtype='datetime64[D]')
+    days = np.zeros(len(dates), dtype=int)
+    return incident_weights(dates, np.array(hours), days, DEPARTURE, REFERENCE, half_life_days)
+
+
+def test_weight_halves_at_half_life():
+    fresh, half, quarter = _weights(['2024-06-30', '2024-05-31', '2024-05-01'], [8, 8, 8], half_life_days=30)
+    assert half / fresh == pytest.approx(0.5)
+    assert quarter / fresh == pytest.approx(0.25)
+
+
+def test_incidents_after_reference_date_have_no_weight():
+    assert _weights(['2024-07-15'], [8])[0] == 0
+
+
+def test_hour_similarity_wraps_across_midnight():
+    assert HOUR_SIMILARITY[23, 1] == pytest.approx(HOUR_SIMILARITY[10, 12])
+    assert HOUR_SIMILARITY[0, 23] == pytest.approx(HOUR_SIMILARITY[0, 1])
+    assert HOUR_SIMILARITY[23, 1] > HOUR_SIMILARITY[23, 19]
+    assert np.allclose(HOUR_SIMILARITY, HOUR_SIMILARITY.T)
+
+
+def test_no_crimes_scores_100():
+    score, breakdown = weighted_safety_score([], DEPARTURE, REFERENCE)
+    assert score == 100.0
+    assert breakdown == {'weighted_count': 0.0, 'weighted_severity': 0.0, 'weighted_violent': 0.0}
+
+
+@pytest.mark.parametrize('params', [
+    {'half_life_days': 'nan'}, {'half_life_days': 0}, {'half_life_days': [1]},
+    {'departure_time': {'a': 1}}, {'reference_date': 'NaT'}
+])
+def test_bad_scoring_parameters_return_400(params):
+    response = app.test_client().post('/api/crimes', json=dict({
+        'from_lat': 40.70, 'from_lng': -74.01, 'to_lat': 40.75, 'to_lng': -73.95, 'scoring': 'weighted'
+    }, **params))
+    assert response.status_code == 400
+    assert 'Invalid scoring parameters' in response.get_json()['error']